@@ -0,0 +1,71 @@
+"""
+Micro-benchmark of ``common.build_locator``.
+
+Compares the former linear scan of selector tests with the first char dispatch
+and with the cached ``build_locator`` on a corpus of typical selectors.
+
+usage (from the root of repository):
+    PYTHONPATH=core python benchmarks/bench_locators.py
+"""
+import re
+import timeit
+
+from selenium.webdriver.common.by import By
+
+from pypo4sel.core import common
+
+CORPUS = [
+    "#login", "#user_name", ".btn-primary", ".nav-item", "input", "tr", "td", "button",
+    "//div[@id='content']//table", ".//span[@class='title']", "./td[2]", "$x:../..",
+    "@username", "@password", "$link_text:Sign in", "$partial_link_text:Forgot",
+    "div.item > a[href]", "#main .row", "[data-test='submit']", "ul li:nth-child(2)",
+]
+
+
+def _starts_with(prefix):
+    return lambda s: s.startswith(prefix)
+
+
+# the implementation replaced by first char dispatch, kept here as a baseline
+_LINEAR_SELECTORS = [
+    (re.compile(r"^\w+$").match, By.TAG_NAME, None),
+    (re.compile(r"^\.-?[_a-zA-Z]+[_a-zA-Z0-9-]*$").match, By.CLASS_NAME, 1),
+    (re.compile(r"^#[A-Za-z]+[:._a-zA-Z0-9-]*$").match, By.ID, 1),
+    (re.compile(r"^@[A-Za-z]+[:._a-zA-Z0-9-]*$").match, By.NAME, 1),
+    (re.compile(r"^(\./|//).+").match, By.XPATH, None),
+    (_starts_with("$x:"), By.XPATH, 3),
+    (_starts_with("$link_text:"), By.LINK_TEXT, 11),
+    (_starts_with("$partial_link_text:"), By.PARTIAL_LINK_TEXT, 19),
+    (re.compile(r"^(\*|\.|#|[\w-]|\[|:).*").match, By.CSS_SELECTOR, None)
+]
+
+
+def linear_scan(selector):
+    s = selector.strip()
+    for test, by, index in _LINEAR_SELECTORS:
+        if test(s):
+            return by, s[index:]
+
+
+def dispatch(selector):
+    # noinspection PyProtectedMember
+    return common._parse_locator(selector.strip())
+
+
+def bench(name, parse, number):
+    for s in CORPUS:
+        assert parse(s) == linear_scan(s), s
+    t = min(timeit.repeat(lambda: [parse(s) for s in CORPUS], number=number, repeat=5))
+    per_call = t / number / len(CORPUS) * 1e6
+    print("{:<20} {:8.3f} us per selector".format(name, per_call))
+    return per_call
+
+
+def main(number=5000):
+    base = bench("linear scan", linear_scan, number)
+    for name, parse in [("first char dispatch", dispatch), ("build_locator", common.build_locator)]:
+        print("{:<20} {:8.1f}x faster".format("", base / bench(name, parse, number)))
+
+
+if __name__ == "__main__":
+    main()
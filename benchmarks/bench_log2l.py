@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of ``log2l.step`` decorator overhead per step.
+
+Measures a call of a plain method, of the same method decorated by the former implementation
+(options copy and uuid4 per step) and by the current one,
+without listeners and with one listener that does nothing.
+
+usage (from the root of repository):
+    PYTHONPATH=core python benchmarks/bench_log2l.py
+"""
+import functools
+import sys
+import timeit
+import uuid
+
+from pypo4sel.core import log2l
+from pypo4sel.core.log2l import Options
+
+
+def legacy_step(method):
+    # the implementation replaced by the fast path, kept here as a baseline
+    step_options = {Options.STEP_NAME: method.__name__}
+
+    def notify(name, *args, **options):
+        [getattr(l, name)(*args, **options) for l in log2l.listeners]
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        options = step_options.copy()
+        if len(args) > 0 and hasattr(args[0], "_name"):
+            options.setdefault(Options.ELEMENT_NAME, args[0]._name)
+        options.setdefault(Options.KWARGS, kwargs)
+        options.setdefault(Options.ARGS, args)
+        step_id = uuid.uuid4()
+        notify("start_step", step_id, **options)
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            notify("exception", step_id, sys.exc_info())
+            raise
+        finally:
+            notify("end_step", step_id)
+
+    return wrapper
+
+
+class Element(object):
+    _name = "element"
+
+    def plain(self, value):
+        return value
+
+    @legacy_step
+    def legacy(self, value):
+        return value
+
+    @log2l.step
+    def current(self, value):
+        return value
+
+
+def bench(name, method, number):
+    t = min(timeit.repeat(lambda: method("keys"), number=number, repeat=5))
+    per_call = t / number * 1e6
+    print("{:<40} {:8.3f} us per step".format(name, per_call))
+    return per_call
+
+
+def main(number=100000):
+    e = Element()
+    for listeners in ([], [log2l.ListenerMixin()]):
+        log2l.listeners[:] = listeners
+        print("listeners: {}".format(len(listeners)))
+        plain = bench("  plain method", e.plain, number)
+        legacy = bench("  former step", e.legacy, number)
+        current = bench("  step", e.current, number)
+        print("  overhead per step: former {:.3f} us, current {:.3f} us".format(legacy - plain, current - plain))
+    log2l.listeners[:] = []
+
+
+if __name__ == "__main__":
+    main()
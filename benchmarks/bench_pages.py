@@ -0,0 +1,182 @@
+"""
+Benchmark of page object scenarios on the in-process fake webdriver (no browser is needed).
+
+Each command of the fake driver takes ``latency`` seconds (2 ms by default, like a local browser),
+so wall time shows both the cost of round trips and the own overhead of the library.
+For each scenario the number of webdriver commands and the best wall time of several runs are printed,
+compare them before and after a change to find performance regressions.
+
+usage (from the root of repository):
+    PYTHONPATH=core python benchmarks/bench_pages.py [latency in ms]
+"""
+import sys
+import threading
+import time
+
+from pypo4sel import PageElementsContainer, parallel_map
+from pypo4sel.core import log2l, waiter
+from pypo4sel.core.dom import HIDDEN_ATTRIBUTE
+from pypo4sel.core.elements import PageElement, PageElementsList
+from pypo4sel.core.fakedriver import FakeDriver
+from pypo4sel.core.tracing import StepTracer
+
+FIELDS = 20
+ITEMS = 100
+
+HTML = """<html><body>
+<div id="fields">{fields}</div>
+<form id="form">{inputs}<input type="checkbox" name="agree"></form>
+<ul id="items">{items}</ul>
+<button id="button">Go</button>
+<div id="message" {hidden}="none">Done</div>
+</body></html>""".format(
+    fields="".join('<span id="field{0}">value {0}</span>'.format(i) for i in range(FIELDS)),
+    inputs="".join('<input name="input{0}">'.format(i) for i in range(10)),
+    items="".join('<li class="item"><a href="/item/{0}">item {0}</a></li>'.format(i) for i in range(ITEMS)),
+    hidden=HIDDEN_ATTRIBUTE)
+
+
+class Fields(PageElementsContainer):
+    locals().update(("field{}".format(i), PageElement("#field{}".format(i))) for i in range(FIELDS))
+
+    def __init__(self, driver):
+        self.driver = driver
+
+
+class Form(PageElementsContainer):
+    locals().update(("input{}".format(i), PageElement("[name=input{}]".format(i))) for i in range(10))
+    agree = PageElement("[name=agree]")
+
+    def __init__(self, driver):
+        self.driver = driver
+
+
+class Page(PageElementsContainer):
+    items = PageElementsList("#items > li")
+    button = PageElement("#button")
+    message = PageElement("#message")
+
+    def __init__(self, driver):
+        self.driver = driver
+
+
+def read_fields(driver):
+    page = Fields(driver)
+    return [e.text for _, e in page.all_elements()]
+
+
+def read_prefetched_fields(driver):
+    page = Fields(driver)
+    page.prefetch()
+    return [e.text for _, e in page.all_elements()]
+
+
+def read_snapshot_fields(driver):
+    return read_fields(driver.snapshot())
+
+
+def iterate_list(driver):
+    return [item.text for item in Page(driver).items]
+
+
+def fetch_list(driver):
+    return [record.text for record in Page(driver).items.fetch()]
+
+
+def parallel_list(driver):
+    return [r.get() for r in parallel_map(lambda item: item.text, list(Page(driver).items), workers=8)]
+
+
+def type_form(driver):
+    page = Form(driver)
+    for name, e in page.all_elements():
+        if name != "agree":
+            e.clear()
+            e.send_keys("text")
+    page.agree.click()
+
+
+def fill_form(driver):
+    page = Form(driver)
+    page.fill([("input{}".format(i), "text") for i in range(10)] + [("agree", True)])
+
+
+def click_stale(driver):
+    page = Page(driver)
+    for _ in range(5):
+        page.button.click()
+        driver.inject_stale()
+
+
+def clicks(driver, number=50):
+    page = Page(driver)
+    for _ in range(number):
+        page.button.click()
+
+
+def clicks_traced(driver):
+    tracer = StepTracer()
+    log2l.listeners.append(tracer)
+    try:
+        clicks(driver)
+    finally:
+        log2l.listeners.remove(tracer)
+
+
+def wait_rendering(driver):
+    timer = threading.Timer(0.1, lambda: driver.node("#message").attrib.pop(HIDDEN_ATTRIBUTE))
+    timer.start()
+    try:
+        waiter.wait_displayed(Page(driver).message, 5)
+    finally:
+        timer.cancel()
+
+
+def wait_rendering_in_browser(driver):
+    engine, waiter.wait_engine = waiter.wait_engine, waiter.BrowserWait()
+    try:
+        wait_rendering(driver)
+    finally:
+        waiter.wait_engine = engine
+
+
+SCENARIOS = [
+    ("PageElement: {} fields".format(FIELDS), read_fields),
+    ("PageElement: {} fields after prefetch".format(FIELDS), read_prefetched_fields),
+    ("PageElement: {} fields of snapshot".format(FIELDS), read_snapshot_fields),
+    ("PageElementsList: {} items iteration".format(ITEMS), iterate_list),
+    ("PageElementsList: {} items fetch".format(ITEMS), fetch_list),
+    ("PageElementsList: {} items, 8 threads".format(ITEMS), parallel_list),
+    ("form: clear and send_keys", type_form),
+    ("form: fill", fill_form),
+    ("stale: 5 clicks, stale each time", click_stale),
+    ("Waiter: rendering after 100 ms", wait_rendering),
+    ("Waiter: rendering after 100 ms, BrowserWait", wait_rendering_in_browser),
+    ("log2l: 50 clicks", clicks),
+    ("log2l: 50 clicks with StepTracer", clicks_traced),
+]
+
+
+def run(scenario, latency, repeat=3):
+    best, commands = None, None
+    for _ in range(repeat):
+        driver = FakeDriver(HTML, latency=latency)
+        driver.implicitly_wait(0)
+        start = time.time()
+        scenario(driver)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+        commands = driver.counters.command_count
+    return commands, best
+
+
+def main(latency_ms=2.0):
+    print("latency {} ms per command".format(latency_ms))
+    print("{:<50} {:>8} {:>10}".format("scenario", "commands", "wall, ms"))
+    for name, scenario in SCENARIOS:
+        commands, elapsed = run(scenario, latency_ms / 1000.0)
+        print("{:<50} {:>8} {:>10.1f}".format(name, commands, elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main(*[float(a) for a in sys.argv[1:2]])
@@ -2,6 +2,10 @@ from .core import log2l
 from .core import waiter
 from .core.action_chains import ActionChains
 from .core.common import PageElementsContainer
+from .core.elements import Frame
 from .core.elements import PageElement
 from .core.elements import PageElementsList
+from .core.elements import ShadowRoot
+from .core.parallel import parallel_map
+from .core.webdrivers import DriverPool
 from .core.webdrivers import get_driver
@@ -1,10 +1,9 @@
-import time
-
 from selenium import webdriver
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.webdriver.remote.command import Command
 
-from .common import WAIT_STALE_ELEMENT_MAX_TRY, WAIT_ELEMENT_POLL_FREQUENCY
+from . import waiter
+from .common import WAIT_STALE_ELEMENT_MAX_TRY
 
 
 class ActionChains(webdriver.ActionChains):
@@ -21,8 +20,7 @@ class ActionChains(webdriver.ActionChains):
                     self._driver.execute(Command.MOVE_TO, params)
                     break
                 except StaleElementReferenceException:
-                    time.sleep(WAIT_ELEMENT_POLL_FREQUENCY)
-                    element.reload()
+                    waiter.recover_stale(element, attempt)
                     params['element'] = element.id
                 attempt += 1
 
@@ -47,8 +45,7 @@ class TouchActions(webdriver.TouchActions):
                 self._driver.execute(driver_command, param)
                 break
             except StaleElementReferenceException:
-                time.sleep(WAIT_ELEMENT_POLL_FREQUENCY)
-                element.reload()
+                waiter.recover_stale(element, attempt)
             attempt += 1
 
     def tap(self, on_element):
@@ -1,20 +1,60 @@
+import contextlib
+import copy
 import inspect
 import re
+import threading
 from abc import abstractmethod
 
 import six
-from selenium.common.exceptions import InvalidSelectorException, NoSuchElementException
+from selenium.common.exceptions import InvalidSelectorException, NoSuchElementException, \
+    StaleElementReferenceException
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.select import Select
+
+import log2l
+import scripts
 
 WAIT_STALE_ELEMENT_MAX_TRY = 5
 WAIT_ELEMENT_TIMEOUT = 0
 WAIT_ELEMENT_POLL_FREQUENCY = 0.5
+LOCATORS_CACHE_SIZE = 1024
+# seconds while visibility of an element is not checked again before interaction
+VISIBILITY_CACHE_TTL = 1.0
+
+# ids of page elements that don't wait in the current thread, see ``skip_wait``
+_skipped_waits = threading.local()
+
+# owner attribute to keep page elements bound to the owner
+BOUND_ELEMENTS = "_bound_page_elements"
+# class attribute to keep page elements table of the class
+PAGE_ELEMENTS = "_page_elements_table"
 
 
 def get_members_safety(cls):
     # inspect.getmembers calls __get__ method of the field, if exists, that may cause unexpected actions
     # the solution below does't have this problem
-    return reduce(lambda a, b: dict(a, **vars(b)), reversed(inspect.getmro(cls)), {}).items()
+    members = {}
+    for c in reversed(inspect.getmro(cls)):
+        members.update(vars(c))
+    return members.items()
+
+
+def get_page_elements(cls):
+    """
+    Returns BasePageElement(s) declared in the class and its parents sorted by name.
+    The table is built once per class, on the first call elements without name get attribute name,
+    so page elements added to the class after the first call are not taken into account.
+
+    :rtype: tuple[(str, BasePageElement)]
+    """
+    table = cls.__dict__.get(PAGE_ELEMENTS)
+    if table is None:
+        table = tuple(sorted((k, v) for k, v in get_members_safety(cls) if isinstance(v, (BasePageElement,))))
+        for k, v in table:
+            if v._name is None:
+                v._name = k
+        setattr(cls, PAGE_ELEMENTS, table)
+    return table
 
 
 class PageElementsContainer(object):
@@ -26,9 +66,7 @@ class PageElementsContainer(object):
     """
 
     def __new__(cls, *args, **kwargs):
-        for k, v in get_members_safety(cls):
-            if isinstance(v, (BasePageElement,)) and v._name is None:
-                v._name = k
+        get_page_elements(cls)
         # noinspection PyArgumentList
         return super(PageElementsContainer, cls).__new__(cls, *args, **kwargs)
 
@@ -36,8 +74,88 @@ class PageElementsContainer(object):
         """returns all public BasePageElements grouped by this element and it parent(s)
         :rtype: list[(str, BasePageElement)]
         """
-        return [(k, getattr(self, k)) for k, v in get_members_safety(self.__class__)
-                if not k.startswith("_") and isinstance(v, (BasePageElement,))]
+        return [(k, getattr(self, k)) for k, _ in get_page_elements(self.__class__) if not k.startswith("_")]
+
+    def prefetch(self):
+        """
+        Find all public elements of the container and of its nested page blocks with one script call
+        instead of separate ``find_element`` call per element.
+        Elements that are not found stay not loaded and will be searched (and waited) on first usage as usual.
+
+        :return: True if all elements were found, otherwise False
+        :rtype: bool
+        """
+        entries = []
+        self._collect_prefetch(entries, -1)
+        if not entries:
+            return True
+        locators = [[e._locator[0], e._locator[1], many, parent] for e, many, parent in entries]
+        # noinspection PyUnresolvedReferences
+        found = execute_script(self if isinstance(self, elements.PageElement) else self.driver,
+                               scripts.FIND_ALL, locators)
+        for (e, _, _), we in zip(entries, found):
+            if we is not None:
+                e._set_found(we)
+        return all(found)
+
+    @log2l.step
+    def fill(self, mapping, native_events=False):
+        """
+        Fill form fields of the container: text inputs and text areas by strings or numbers,
+        checkboxes and radio buttons by booleans, selects by value or text of an option
+        (list of them for multiple select).
+
+        Fields are found and filled by one script call, the script fires 'input' and 'change' events.
+        Fields the script can't fill (e.g. file inputs or not found fields) are filled by webdriver
+        one by one with usual waiting: ``clear`` and ``send_keys``, ``click`` or selecting of an option.
+        If ``native_events`` is true, fields are only found by the script and all of them are filled by webdriver,
+        so the browser gets real keyboard and mouse events.
+
+        :param mapping: dict or list of pairs of field name (as in ``all_elements``) and value
+        :param native_events: fill fields by webdriver
+        """
+        fields = dict(self.all_elements())
+        items = list(mapping.items() if isinstance(mapping, dict) else mapping)
+        unknown = [name for name, _ in items if not isinstance(fields.get(name), elements.PageElement)]
+        if unknown:
+            raise ValueError("{} has no page elements {}".format(self.__class__.__name__, ", ".join(unknown)))
+        targets = [(fields[name], value) for name, value in items]
+        if not targets:
+            return
+        # noinspection PyUnresolvedReferences
+        filled = execute_script(self if isinstance(self, elements.PageElement) else self.driver, scripts.FILL,
+                                [list(e._locator) for e, _ in targets], [v for _, v in targets], not native_events)
+        for (e, value), (we, done) in zip(targets, filled):
+            if we is not None:
+                e._set_found(we)
+            if not done:
+                _fill_field(e, value)
+
+    def _collect_prefetch(self, entries, parent):
+        for _, e in self.all_elements():
+            if not isinstance(e, (elements.PageElement, elements.PageElementsList)) or not e.__cached__:
+                continue
+            entries.append((e, isinstance(e, elements.PageElementsList), parent))
+            if isinstance(e, elements.PageElement):
+                e._collect_prefetch(entries, len(entries) - 1)
+
+
+def _fill_field(element, value):
+    if isinstance(value, bool):
+        if element.is_selected() != value:
+            element.click()
+    elif element.tag_name == "select":
+        select = Select(element)
+        if select.is_multiple:
+            select.deselect_all()
+        for v in value if isinstance(value, (list, tuple)) else [value]:
+            try:
+                select.select_by_value(six.text_type(v))
+            except NoSuchElementException:
+                select.select_by_visible_text(six.text_type(v))
+    else:
+        element.clear()
+        element.send_keys(six.text_type(value))
 
 
 class BasePageElement(object):
@@ -71,9 +189,34 @@ class BasePageElement(object):
         self._w3c = getattr(self._parent, "w3c", False)
 
     # noinspection PyUnusedLocal
-    def __get__(self, owner, cls):
-        self._fill_owner(owner)
-        return self
+    def __get__(self, owner, cls=None):
+        """
+        Returns copy of the element bound to the ``owner``,
+        so the same page object class may be used by several drivers in parallel threads.
+        The bound copy is kept by the owner and returned for next access of the field.
+        """
+        if owner is None:
+            return self
+        bound_elements = getattr(owner, "__dict__", None)
+        if bound_elements is None:
+            return self._bind(owner)
+        bound_elements = bound_elements.setdefault(BOUND_ELEMENTS, {})
+        bound = bound_elements.get(id(self))
+        if bound is None:
+            bound = bound_elements[id(self)] = self._bind(owner)
+        return bound
+
+    def _bind(self, owner):
+        bound = copy.copy(self)
+        bound._fill_owner(owner)
+        return bound
+
+    def __copy__(self):
+        # caches of found elements are shared between copies, they are separated by owner
+        cls = self.__class__
+        bound = cls.__new__(cls)
+        bound.__dict__.update(self.__dict__)
+        return bound
 
     @abstractmethod
     def reload(self):
@@ -81,7 +224,17 @@ class BasePageElement(object):
 
     @property
     def wait_timeout(self):
-        return WAIT_ELEMENT_TIMEOUT if self.__timeout is None else self.__timeout
+        """
+        Own timeout of the element if it is specified,
+        otherwise implicit timeout of the driver (see ``WebDriverBase.implicitly_wait``) or ``WAIT_ELEMENT_TIMEOUT``
+        """
+        if getattr(self._parent, "is_static", False) is True or is_wait_skipped(self):
+            # page snapshot never changes, there is nothing to wait, or waiting is skipped in this thread
+            return 0
+        if self.__timeout is not None:
+            return self.__timeout
+        timeout = getattr(self._parent, "implicitly_wait_timeout", None)
+        return timeout if isinstance(timeout, (float, int)) else WAIT_ELEMENT_TIMEOUT
 
     @wait_timeout.setter
     def wait_timeout(self, value):
@@ -92,6 +245,33 @@ class BasePageElement(object):
         return self._name or "({}:{})".format(*self._locator)
 
 
+@contextlib.contextmanager
+def skip_wait(*page_elements):
+    """
+    Page elements don't wait inside the context in the current thread,
+    other threads use the same elements with their timeouts.
+    Items of a list don't wait if the list doesn't wait.
+    """
+    skipped = _skipped_ids()
+    added = set(id(getattr(e, "_container", e)) for e in page_elements) - skipped
+    skipped.update(added)
+    try:
+        yield
+    finally:
+        skipped.difference_update(added)
+
+
+def is_wait_skipped(element):
+    return id(element) in _skipped_ids()
+
+
+def _skipped_ids():
+    skipped = getattr(_skipped_waits, "ids", None)
+    if skipped is None:
+        skipped = _skipped_waits.ids = set()
+    return skipped
+
+
 def define_selector(by, value, el_class):
     """
     :param by:
@@ -206,23 +386,77 @@ class FindOverride(object):
 import elements
 
 
-def _stats_with(prefix):
-    return lambda s: s.startswith(prefix)
-
+_is_tag_name = re.compile(r"^\w+$").match
+_is_class_name = re.compile(r"^\.-?[_a-zA-Z]+[_a-zA-Z0-9-]*$").match
+_is_id = re.compile(r"^#[A-Za-z]+[:._a-zA-Z0-9-]*$").match
+_is_name = re.compile(r"^@[A-Za-z]+[:._a-zA-Z0-9-]*$").match
+_is_css = re.compile(r"^(\*|\.|#|[\w-]|\[|:).*").match
 
-selectors = [
-    (re.compile(r"^\w+$").match, By.TAG_NAME, None),
-    (re.compile(r"^\.-?[_a-zA-Z]+[_a-zA-Z0-9-]*$").match, By.CLASS_NAME, 1),
-    (re.compile(r"^#[A-Za-z]+[:._a-zA-Z0-9-]*$").match, By.ID, 1),
-    (re.compile(r"^@[A-Za-z]+[:._a-zA-Z0-9-]*$").match, By.NAME, 1),
-    (re.compile(r"^(\./|//).+").match, By.XPATH, None),
-    (_stats_with("$x:"), By.XPATH, 3),
-    (_stats_with("$link_text:"), By.LINK_TEXT, 11),
-    (_stats_with("$partial_link_text:"), By.PARTIAL_LINK_TEXT, 19),
-    (re.compile(r"^(\*|\.|#|[\w-]|\[|:).*").match, By.CSS_SELECTOR, None)
+_prefixes = [
+    ("$x:", By.XPATH),
+    ("$link_text:", By.LINK_TEXT),
+    ("$partial_link_text:", By.PARTIAL_LINK_TEXT),
 ]
 
 
+def _parse_locator(s):
+    # dispatch by the first char, so each selector is checked by one or two tests only
+    first = s[:1]
+    if first == "#":
+        return (By.ID, s[1:]) if _is_id(s) else (By.CSS_SELECTOR, s)
+    if first == ".":
+        if s.startswith("./") and len(s) > 2:
+            return By.XPATH, s
+        return (By.CLASS_NAME, s[1:]) if _is_class_name(s) else (By.CSS_SELECTOR, s)
+    if first == "/":
+        return (By.XPATH, s) if s.startswith("//") and len(s) > 2 else None
+    if first == "@":
+        return (By.NAME, s[1:]) if _is_name(s) else None
+    if first == "$":
+        for prefix, by in _prefixes:
+            if s.startswith(prefix):
+                return by, s[len(prefix):]
+        return None
+    if _is_tag_name(s):
+        return By.TAG_NAME, s
+    return (By.CSS_SELECTOR, s) if _is_css(s) else None
+
+
+class _LocatorCache(object):
+    """
+    Approximate LRU cache with O(1) dict operations:
+    recently used locators are kept in 'hot' generation,
+    when it is full, it becomes 'cold' and previous 'cold' one is dropped.
+    Locators found in 'cold' generation are moved back to 'hot' one.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.__hot = {}
+        self.__cold = {}
+
+    def get(self, key):
+        value = self.__hot.get(key)
+        if value is None:
+            value = self.__cold.get(key)
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        if len(self.__hot) >= self.size:
+            self.__cold = self.__hot
+            self.__hot = {}
+        self.__hot[key] = value
+
+    def clear(self):
+        self.__hot = {}
+        self.__cold = {}
+
+
+locators_cache = _LocatorCache(LOCATORS_CACHE_SIZE)
+
+
 def build_locator(selector):
     """
     - ID = "#valid_id"
@@ -235,6 +469,8 @@ def build_locator(selector):
 
     CSS_SELECTOR = all other that starts with *|.|#|[\w-]|\[|:
 
+    Parsed selectors are cached in ``locators_cache``.
+
     :type selector: str|tuple
     :param selector:
     :rtype: tuple[selenium.webdriver.common.by.By, str]
@@ -245,15 +481,110 @@ def build_locator(selector):
     if not isinstance(selector, six.string_types):
         raise InvalidSelectorException("Invalid locator values passed in")
 
-    s = selector.strip()
-    for test, by, index in selectors:
-        if test(s):
-            return by, s[index:]
-    raise InvalidSelectorException("Invalid locator values passed in: {}".format(selector))
+    locator = locators_cache.get(selector)
+    if locator is None:
+        locator = _parse_locator(selector.strip())
+        if locator is None:
+            raise InvalidSelectorException("Invalid locator values passed in: {}".format(selector))
+        locators_cache.put(selector, locator)
+    return locator
 
 
 def find(owner, locator):
+    if isinstance(owner, elements.ShadowRoot):
+        return execute_script(owner, scripts.FIND_ALL, [[locator[0], locator[1], False, -1]])[0] or False
     try:
-        return super(FindOverride, owner).find_element(*locator)
+        return super(FindOverride, _search_context(owner)).find_element(*locator)
     except NoSuchElementException:
         return False
+
+
+def find_all(owner, locator):
+    if isinstance(owner, elements.ShadowRoot):
+        return execute_script(owner, scripts.FIND_ALL, [[locator[0], locator[1], True, -1]])[0] or []
+    return super(FindOverride, _search_context(owner)).find_elements(*locator)
+
+
+def _search_context(owner):
+    # children of a frame are searched in the document of the frame, children of other elements are searched
+    # by the element that switches the driver to own frames, children of the driver are searched in the top document
+    if isinstance(owner, elements.Frame):
+        enter_frames(owner.parent, frames_of(owner) + (owner,))
+        return owner.parent
+    if not isinstance(owner, elements.PageElement):
+        enter_frames(owner, ())
+    return owner
+
+
+def frames_of(element):
+    """
+    :return: frames containing the page element, from the top one
+    :rtype: tuple[elements.Frame]
+    """
+    frames = []
+    owner = element._owner
+    while isinstance(owner, elements.PageElement):
+        if isinstance(owner, elements.Frame):
+            frames.append(owner)
+        owner = owner._owner
+    frames.reverse()
+    return tuple(frames)
+
+
+def enter_frames(driver, frames):
+    """
+    Switch the driver into the ``frames`` (from the top one) if it is not switched into them yet.
+    Frames switched by the library are tracked by the driver, if a frame was switched by user,
+    the library doesn't switch the driver back for elements outside of frames.
+    """
+    current = getattr(driver, "__dict__", {}).get("_frame_scope", ())
+    if not frames and not current or current == tuple(f._id for f in frames):
+        return
+    driver._switching_scope = True
+    try:
+        driver.switch_to.default_content()
+        driver._frame_scope = ()
+        for frame in frames:
+            try:
+                driver.switch_to.frame(frame)
+            except StaleElementReferenceException:
+                frame.reload()
+                driver.switch_to.frame(frame)
+            driver._frame_scope += (frame.id,)
+    finally:
+        driver._switching_scope = False
+
+
+def execute_script(owner, script, *args):
+    """
+    Execute ``script`` with ``owner`` element as first argument,
+    if owner is web driver or ``elements.Frame`` then null is passed and script should use document instead
+    (the script is executed in the document of the frame),
+    for ``elements.ShadowRoot`` list with the shadow host is passed (see ``scripts.ROOT``).
+    If owner element is stale, it is reloaded and the script is executed again.
+    """
+    return _execute_in(owner, "execute_script", script, args)
+
+
+def execute_async_script(owner, script, *args):
+    """
+    The same as ``execute_script`` but for asynchronous script.
+    """
+    return _execute_in(owner, "execute_async_script", script, args)
+
+
+def _execute_in(owner, method, script, args):
+    if isinstance(owner, elements.Frame):
+        # scripts are executed in the document of the frame
+        enter_frames(owner.parent, frames_of(owner) + (owner,))
+        return getattr(owner.parent, method)(script, None, *args)
+    if isinstance(owner, elements.PageElement):
+        enter_frames(owner.parent, frames_of(owner))
+        root = [owner] if isinstance(owner, elements.ShadowRoot) else owner
+        try:
+            return getattr(owner.parent, method)(script, root, *args)
+        except StaleElementReferenceException:
+            owner.reload()
+            return getattr(owner.parent, method)(script, root, *args)
+    enter_frames(owner, ())
+    return getattr(owner, method)(script, None, *args)
@@ -0,0 +1,83 @@
+"""
+Counters of WebDriver commands of a session.
+
+Each driver inherited from ``webdrivers.WebDriverBase`` has own ``counters``:
+
+    driver.counters.reset()
+    ... run test ...
+    print driver.counters.as_dict()
+    # {'commands': {'findElement': {'count': 3, 'total': 0.05, 'max': 0.02}, ...},
+    #  'command_count': 12, 'command_time': 0.4, 'stale_retries': 1, 'wait_sleep': 1.2, 'wait_polls': 5}
+
+``command_time`` is the time spent in round trips to WebDriver,
+``wait_sleep`` is the time spent by ``waiter.Waiter`` between polls, the rest of a test time is the own time of the test.
+"""
+import threading
+import time
+
+# time.monotonic is not available in python 2
+clock = getattr(time, "monotonic", time.time)
+
+
+class CommandCounters(object):
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.commands = {}
+            """ :type: dict[str, list] command -> [count, total time, max time] """
+            self.stale_retries = 0
+            self.wait_sleep = 0.0
+            self.wait_polls = 0
+
+    def command(self, name, duration):
+        with self.__lock:
+            stat = self.commands.get(name)
+            if stat is None:
+                self.commands[name] = [1, duration, duration]
+            else:
+                stat[0] += 1
+                stat[1] += duration
+                if duration > stat[2]:
+                    stat[2] = duration
+
+    def stale_retry(self):
+        with self.__lock:
+            self.stale_retries += 1
+
+    def sleep(self, duration):
+        with self.__lock:
+            self.wait_polls += 1
+            self.wait_sleep += duration
+
+    @property
+    def command_count(self):
+        return sum(s[0] for s in list(self.commands.values()))
+
+    @property
+    def command_time(self):
+        return sum(s[1] for s in list(self.commands.values()))
+
+    def as_dict(self):
+        with self.__lock:
+            commands = dict((name, {"count": s[0], "total": s[1], "max": s[2]}) for name, s in self.commands.items())
+            result = {
+                "commands": commands,
+                "stale_retries": self.stale_retries,
+                "wait_sleep": self.wait_sleep,
+                "wait_polls": self.wait_polls,
+            }
+        result["command_count"] = sum(c["count"] for c in commands.values())
+        result["command_time"] = sum(c["total"] for c in commands.values())
+        return result
+
+
+def of(driver):
+    """
+    :return: counters of the driver or None if the driver doesn't count commands
+    :rtype: CommandCounters
+    """
+    result = getattr(driver, "counters", None)
+    return result if isinstance(result, CommandCounters) else None
@@ -0,0 +1,472 @@
+"""
+Snapshot of a page (or of a part of the page) to check it without requests to webdriver.
+
+    snapshot = driver.snapshot()  # one request to webdriver
+    page = MyPage(snapshot)  # the same page object classes are used
+    assert page.title.text == "Title"
+    assert len(page.items) == 30
+    assert page.items[3].get_attribute("href").endswith("/item/3")
+
+The snapshot acts as a webdriver, it executes commands of reading (search of elements, text, attributes,
+tag name, selected, enabled and displayed state) locally by the parsed HTML and rejects all other commands.
+
+Limitations:
+ - css selectors: tag, id, class, attribute selectors, combinators and pseudo classes
+   ``first-child``, ``last-child``, ``only-child``, ``nth-child``, ``checked``, ``disabled``, ``enabled``
+ - xpath: subset supported by ``xml.etree.ElementTree`` (``//tag[@attr='value']``, positions, ``..`` etc.)
+ - visibility of elements is computed by the browser when the snapshot is taken
+   (or by ``hidden`` attribute and inline styles for snapshots created from html),
+   text is composed without layout, so it may differ in whitespaces from text given by webdriver
+"""
+import itertools
+import re
+import xml.etree.ElementTree as ET
+
+import six
+from selenium import webdriver
+from selenium.common.exceptions import InvalidSelectorException, NoSuchElementException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.webelement import WebElement
+from six.moves import html_parser, html_entities
+from six.moves.urllib.parse import urljoin
+
+import webdrivers
+
+HIDDEN_ATTRIBUTE = "data-snapshot-hidden"
+
+VOID_TAGS = frozenset("area base br col embed hr img input keygen link meta param source track wbr".split())
+BLOCK_TAGS = frozenset("address article aside blockquote dd details div dl dt fieldset figcaption figure footer form "
+                       "h1 h2 h3 h4 h5 h6 header hr li main nav ol p pre section summary table tbody thead tfoot tr "
+                       "ul".split())
+NO_TEXT_TAGS = frozenset("head script style template noscript".split())
+BOOLEAN_ATTRIBUTES = frozenset("async autofocus autoplay checked compact controls declare default defer disabled "
+                               "hidden ismap loop multiple muted nohref noresize noshade novalidate nowrap open "
+                               "readonly required reversed selected".split())
+URL_ATTRIBUTES = frozenset("href src action".split())
+
+
+class DomSnapshot(webdrivers.WebDriverBase, webdriver.Remote):
+    """
+    Parsed HTML of a page or of an element acting as a webdriver, see module description.
+    """
+    _ids = itertools.count(1)
+    # compiled XPaths use functions that are not supported by ElementTree
+    compile_locators = False
+
+    def __init__(self, html, url=None, title=None):
+        # remote driver is not initialized, the snapshot doesn't start any session
+        self.session_id = "snapshot-{}".format(next(DomSnapshot._ids))
+        self.w3c = False
+        self._is_remote = False
+        self.url = url
+        self._title = title
+        self._element_numbers = itertools.count(1)
+        self._load(html)
+
+    def _load(self, html):
+        self.html = html
+        self.document = parse(html)
+        self._parents = dict((child, parent) for parent in self.document.iter() for child in parent)
+        self._elements = {}
+        self._element_ids = {}
+
+    @property
+    def is_static(self):
+        """ DOM of the snapshot never changes, so page elements don't wait for it """
+        return True
+
+    def execute(self, driver_command, params=None):
+        params = params or {}
+        handler = self._handlers.get(driver_command)
+        if handler is None:
+            raise WebDriverException("Command '{}' is not supported by DOM snapshot".format(driver_command))
+        return {"value": handler(self, params)}
+
+    def snapshot(self):
+        return self
+
+    # commands
+    def _find_element(self, params):
+        found = self._find(self.document, params)
+        if not found:
+            raise NoSuchElementException("Element {using}={value} was not found in the snapshot".format(**params))
+        return self._wrap(found[0])
+
+    def _find_elements(self, params):
+        return [self._wrap(el) for el in self._find(self.document, params)]
+
+    def _find_child_element(self, params):
+        found = self._find(self._element(params), params)
+        if not found:
+            raise NoSuchElementException("Element {using}={value} was not found in the snapshot".format(**params))
+        return self._wrap(found[0])
+
+    def _find_child_elements(self, params):
+        return [self._wrap(el) for el in self._find(self._element(params), params)]
+
+    def _text(self, params):
+        el = self._element(params)
+        return text(el) if self._displayed(el) else ""
+
+    def _attribute(self, params):
+        el, name = self._element(params), params["name"]
+        if name in ("class", "className"):
+            return el.get("class")
+        if name in BOOLEAN_ATTRIBUTES:
+            return "true" if name in el.attrib else None
+        if name == "value":
+            return value(el)
+        if name == "textContent":
+            return "".join(el.itertext())
+        if name == "innerText":
+            return text(el)
+        if name in URL_ATTRIBUTES and name in el.attrib and self.url:
+            return urljoin(self.url, el.get(name))
+        return el.get(name)
+
+    def _tag_name(self, params):
+        return self._element(params).tag
+
+    def _is_selected(self, params):
+        el = self._element(params)
+        return "checked" in el.attrib or "selected" in el.attrib
+
+    def _is_enabled(self, params):
+        return "disabled" not in self._element(params).attrib
+
+    def _is_displayed(self, params):
+        return self._displayed(self._element(params))
+
+    def _title_command(self, params):
+        if self._title is not None:
+            return self._title
+        el = self.document.find(".//title")
+        return "" if el is None else " ".join("".join(el.itertext()).split())
+
+    def _current_url(self, params):
+        return self.url
+
+    def _page_source(self, params):
+        return self.html
+
+    _handlers = {
+        Command.FIND_ELEMENT: _find_element,
+        Command.FIND_ELEMENTS: _find_elements,
+        Command.FIND_CHILD_ELEMENT: _find_child_element,
+        Command.FIND_CHILD_ELEMENTS: _find_child_elements,
+        Command.GET_ELEMENT_TEXT: _text,
+        Command.GET_ELEMENT_ATTRIBUTE: _attribute,
+        Command.GET_ELEMENT_TAG_NAME: _tag_name,
+        Command.IS_ELEMENT_SELECTED: _is_selected,
+        Command.IS_ELEMENT_ENABLED: _is_enabled,
+        Command.IS_ELEMENT_DISPLAYED: _is_displayed,
+        Command.GET_TITLE: _title_command,
+        Command.GET_CURRENT_URL: _current_url,
+        Command.GET_PAGE_SOURCE: _page_source,
+    }
+    if hasattr(Command, "GET_ELEMENT_PROPERTY"):
+        _handlers[Command.GET_ELEMENT_PROPERTY] = _attribute
+
+    def _find(self, context, params):
+        return find(context, params["using"], params["value"], self._parents)
+
+    def _element(self, params):
+        try:
+            return self._elements[params["id"]]
+        except KeyError:
+            raise NoSuchElementException("Element {} doesn't belong to the snapshot".format(params["id"]))
+
+    def _wrap(self, el):
+        element_id = self._element_ids.get(el)
+        if element_id is None:
+            element_id = self._element_ids[el] = "{}-{}".format(self.session_id, next(self._element_numbers))
+            self._elements[element_id] = el
+        return WebElement(self, element_id)
+
+    def _displayed(self, el):
+        return is_displayed(el, self._parents)
+
+
+class _TreeBuilder(html_parser.HTMLParser):
+    def __init__(self):
+        html_parser.HTMLParser.__init__(self)
+        self.document = ET.Element("#document")
+        self.stack = [self.document]
+
+    def handle_starttag(self, tag, attrs):
+        el = ET.SubElement(self.stack[-1], tag, dict((k, "" if v is None else v) for k, v in attrs))
+        if tag not in VOID_TAGS:
+            self.stack.append(el)
+
+    def handle_startendtag(self, tag, attrs):
+        ET.SubElement(self.stack[-1], tag, dict((k, "" if v is None else v) for k, v in attrs))
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        parent = self.stack[-1]
+        if len(parent):
+            parent[-1].tail = (parent[-1].tail or "") + data
+        else:
+            parent.text = (parent.text or "") + data
+
+    def handle_entityref(self, name):
+        codepoint = html_entities.name2codepoint.get(name)
+        self.handle_data("&{};".format(name) if codepoint is None else six.unichr(codepoint))
+
+    def handle_charref(self, name):
+        self.handle_data(six.unichr(int(name[1:], 16) if name[0] in "xX" else int(name)))
+
+
+def parse(html):
+    """
+    :return: document element, its children are top elements of the html
+    :rtype: xml.etree.ElementTree.Element
+    """
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.document
+
+
+def find(context, by, selector, parents):
+    """
+    Find elements inside ``context`` element (or document) by webdriver locator.
+    """
+    if by == By.XPATH:
+        return _find_by_xpath(context, selector, parents)
+    if by in (By.LINK_TEXT, By.PARTIAL_LINK_TEXT):
+        return [el for el in _descendants(context) if el.tag == "a" and
+                (text(el) == selector if by == By.LINK_TEXT else selector in text(el))]
+    if by == By.ID:
+        return [el for el in _descendants(context) if el.get("id") == selector]
+    if by == By.NAME:
+        return [el for el in _descendants(context) if el.get("name") == selector]
+    if by == By.CLASS_NAME:
+        return [el for el in _descendants(context) if selector in el.get("class", "").split()]
+    if by == By.TAG_NAME:
+        return [el for el in _descendants(context) if el.tag == selector.lower()]
+    if by == By.CSS_SELECTOR:
+        groups = _css_cache.get(selector)
+        if groups is None:
+            groups = _css_cache[selector] = parse_css(selector)
+        return [el for el in _descendants(context) if any(_match(el, c, len(c) - 1, parents) for c in groups)]
+    raise InvalidSelectorException("Locator '{}' is not supported by DOM snapshot".format(by))
+
+
+def _descendants(context):
+    return itertools.islice(context.iter(), 1, None)
+
+
+def _find_by_xpath(context, selector, parents):
+    if selector.startswith("/"):
+        # absolute path is evaluated from the document
+        while context in parents:
+            context = parents[context]
+        selector = "." + selector
+    try:
+        return context.findall(selector)
+    except (SyntaxError, KeyError, TypeError, AttributeError) as e:
+        raise InvalidSelectorException("Xpath '{}' is not supported by DOM snapshot: {}".format(selector, e))
+
+
+def _match(el, complex_selector, i, parents):
+    combinator, conditions = complex_selector[i]
+    if not all(c(el, parents) for c in conditions):
+        return False
+    if combinator is None:
+        return True
+    if combinator == ">":
+        parent = parents.get(el)
+        return parent is not None and _match(parent, complex_selector, i - 1, parents)
+    if combinator == " ":
+        parent = parents.get(el)
+        while parent is not None:
+            if _match(parent, complex_selector, i - 1, parents):
+                return True
+            parent = parents.get(parent)
+        return False
+    siblings = list(parents.get(el, ()))
+    previous = siblings[:_index(el, parents)]
+    if combinator == "+":
+        return bool(previous) and _match(previous[-1], complex_selector, i - 1, parents)
+    return any(_match(s, complex_selector, i - 1, parents) for s in previous)
+
+
+def _index(el, parents, last=False):
+    siblings = list(parents.get(el, ()))
+    if not siblings:
+        return 0
+    index = siblings.index(el)
+    return len(siblings) - 1 - index if last else index
+
+
+def text(el):
+    """
+    Text of displayed part of the element with collapsed whitespaces, block elements are separated by new lines.
+    """
+    parts = []
+    _collect_text(el, parts)
+    lines = ("".join(parts)).split("\n")
+    return "\n".join(line for line in (" ".join(l.split()) for l in lines) if line)
+
+
+def _collect_text(el, parts):
+    hidden = _hidden(el)
+    if el.tag in NO_TEXT_TAGS or hidden == "none":
+        return
+    visible = hidden != "hidden"
+    block = el.tag in BLOCK_TAGS
+    if block:
+        parts.append("\n")
+    elif el.tag == "br":
+        parts.append("\n")
+    elif el.tag in ("td", "th"):
+        parts.append(" ")
+    if el.text and visible:
+        parts.append(el.text)
+    for child in el:
+        _collect_text(child, parts)
+        if child.tail and visible:
+            parts.append(child.tail)
+    if block:
+        parts.append("\n")
+
+
+_INLINE_DISPLAY_NONE = re.compile(r"(^|;)\s*display\s*:\s*none", re.I)
+_INLINE_VISIBILITY_HIDDEN = re.compile(r"(^|;)\s*visibility\s*:\s*(hidden|collapse)", re.I)
+
+
+def _hidden(el):
+    """
+    :return: 'none' if element and its descendants are not displayed, 'hidden' if the element is invisible,
+            otherwise None
+    """
+    marker = el.get(HIDDEN_ATTRIBUTE)
+    if marker is not None:
+        return marker
+    if "hidden" in el.attrib or (el.tag == "input" and el.get("type", "").lower() == "hidden") \
+            or _INLINE_DISPLAY_NONE.search(el.get("style", "")):
+        return "none"
+    if _INLINE_VISIBILITY_HIDDEN.search(el.get("style", "")):
+        return "hidden"
+    return None
+
+
+def is_displayed(el, parents):
+    if el.tag in NO_TEXT_TAGS or _hidden(el) == "hidden":
+        return False
+    while el is not None:
+        if _hidden(el) == "none":
+            return False
+        el = parents.get(el)
+    return True
+
+
+def value(el):
+    """
+    Current value of a form field, as ``value`` property of the element.
+    """
+    if el.tag == "textarea":
+        return "".join(el.itertext())
+    if el.tag == "select":
+        options = list(el.iter("option"))
+        selected = [o for o in options if "selected" in o.attrib] or options[:1]
+        return value(selected[0]) if selected else ""
+    if el.tag == "option" and "value" not in el.attrib:
+        return " ".join("".join(el.itertext()).split())
+    return el.get("value")
+
+
+# css selectors
+_css_cache = {}
+_CSS_TOKEN = re.compile(r"""
+    \s*(?P<combinator>[>+~,])\s* |
+    (?P<space>\s+) |
+    (?P<tag>\*|[a-zA-Z][\w-]*) |
+    \#(?P<id>[\w-]+) |
+    \.(?P<cls>[\w-]+) |
+    \[\s*(?P<attr>[\w:-]+)\s*(?:(?P<op>[~|^$*]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<uq>[^\]\s]+))\s*)?\] |
+    :(?P<pseudo>[\w-]+)(?:\(\s*(?P<arg>[^)]*?)\s*\))?
+""", re.X)
+
+_ATTRIBUTE_OPERATORS = {
+    None: lambda actual, expected: actual is not None,
+    "=": lambda actual, expected: actual == expected,
+    "~=": lambda actual, expected: actual is not None and expected in actual.split(),
+    "|=": lambda actual, expected: actual is not None and (actual == expected or actual.startswith(expected + "-")),
+    "^=": lambda actual, expected: actual is not None and bool(expected) and actual.startswith(expected),
+    "$=": lambda actual, expected: actual is not None and bool(expected) and actual.endswith(expected),
+    "*=": lambda actual, expected: actual is not None and bool(expected) and expected in actual,
+}
+
+
+def parse_css(selector):
+    """
+    :return: list of complex selectors, each one is a list of pairs (combinator, list of conditions)
+    """
+    groups, complex_selector, conditions, combinator = [], [], None, None
+    pos, selector = 0, selector.strip()
+    while pos < len(selector):
+        m = _CSS_TOKEN.match(selector, pos)
+        if m is None or m.end() == pos:
+            raise InvalidSelectorException("Css selector '{}' is not supported by DOM snapshot".format(selector))
+        pos = m.end()
+        if m.group("combinator") or m.group("space"):
+            if conditions is None:
+                raise InvalidSelectorException("Invalid css selector '{}'".format(selector))
+            complex_selector.append((combinator, conditions))
+            conditions = None
+            combinator = m.group("combinator") or " "
+            if combinator == ",":
+                groups.append(complex_selector)
+                complex_selector, combinator = [], None
+            continue
+        if conditions is None:
+            conditions = []
+        conditions.append(_condition(m, selector))
+    if conditions is None:
+        raise InvalidSelectorException("Invalid css selector '{}'".format(selector))
+    complex_selector.append((combinator, conditions))
+    groups.append(complex_selector)
+    return groups
+
+
+def _condition(m, selector):
+    if m.group("tag"):
+        tag = m.group("tag").lower()
+        return (lambda el, parents: True) if tag == "*" else (lambda el, parents: el.tag == tag)
+    if m.group("id"):
+        return lambda el, parents: el.get("id") == m.group("id")
+    if m.group("cls"):
+        return lambda el, parents: m.group("cls") in el.get("class", "").split()
+    if m.group("attr"):
+        name, operator = m.group("attr"), _ATTRIBUTE_OPERATORS[m.group("op")]
+        expected = next((v for v in (m.group("dq"), m.group("sq"), m.group("uq")) if v is not None), None)
+        return lambda el, parents: operator(el.get(name), expected)
+    pseudo, arg = m.group("pseudo"), m.group("arg")
+    if pseudo == "first-child":
+        return lambda el, parents: _index(el, parents) == 0
+    if pseudo == "last-child":
+        return lambda el, parents: _index(el, parents, last=True) == 0
+    if pseudo == "only-child":
+        return lambda el, parents: len(parents.get(el, ())) == 1
+    if pseudo == "nth-child" and arg is not None:
+        if arg in ("odd", "even"):
+            rest = 1 if arg == "odd" else 0
+            return lambda el, parents: (_index(el, parents) + 1) % 2 == rest
+        if arg.isdigit():
+            return lambda el, parents: _index(el, parents) + 1 == int(arg)
+    if pseudo == "checked":
+        return lambda el, parents: "checked" in el.attrib or "selected" in el.attrib
+    if pseudo == "disabled":
+        return lambda el, parents: "disabled" in el.attrib
+    if pseudo == "enabled":
+        return lambda el, parents: "disabled" not in el.attrib
+    raise InvalidSelectorException("Pseudo class ':{}' of '{}' is not supported by DOM snapshot".format(
+        pseudo, selector))
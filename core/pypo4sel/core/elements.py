@@ -1,16 +1,25 @@
+import collections
+import contextlib
 import functools
 import hashlib
 import re
 import time
-import uuid
 
+import six
+from selenium.common import exceptions
 from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, \
     ElementNotVisibleException
 from selenium.webdriver.remote.webelement import WebElement
 
 import common
+import counters
 import log2l
-from .waiter import wait_displayed, wait
+import scripts
+import waiter
+
+# errors of interaction with element that is not visible, older selenium versions don't have the second one
+NOT_INTERACTABLE_ERRORS = (ElementNotVisibleException,
+                           getattr(exceptions, "ElementNotInteractableException", ElementNotVisibleException))
 
 
 def need_interaction(func):
@@ -31,13 +40,21 @@ class PageElement(common.BasePageElement, common.PageElementsContainer, common.F
     Encapsulate logic of changing of context of element usage.
 
     Catch StaleElementReferenceException, if it occurs, and try to find the element again,
-    if element found then continue execution, otherwise raise NoSuchElementException
+    if element found then continue execution, otherwise raise NoSuchElementException.
+    The element is found again by ``stale_recovery`` policy (``waiter.stale_recovery`` if it is None).
+    Found element is not used after navigation or switch of frame or window by the driver
+    (see ``WebDriverBase.epoch``), it is searched again before the next command instead.
+
+    Before interaction (click, clear) wait until the element is displayed. The check is skipped
+    if the same web element was seen displayed less than ``visibility_ttl`` seconds ago
+    (``common.VISIBILITY_CACHE_TTL`` if it is None), if the element has been hidden since,
+    the interaction is repeated after waiting.
 
     Class instance may be used as a part of page object/page block
     or class type may be specified directly as last parameter of find/child_element(s) to wrap found element(s).
 
     For page object field may be specified __set__ method for more useful interaction with the element.
-    In this case ``_fill_owner`` should be called first in the __set__ method.
+    In this case the element bound to the owner should be taken by ``__get__`` first in the __set__ method.
 
     Examples:
 
@@ -51,8 +68,7 @@ class PageElement(common.BasePageElement, common.PageElementsContainer, common.F
             ....
 
         def __set__(self, owner, value):
-            self._fill_owner(owner)
-            self.do_some_work(value)
+            self.__get__(owner).do_some_work(value)
 
 
     class SomePageObject(object):
@@ -71,31 +87,44 @@ class PageElement(common.BasePageElement, common.PageElementsContainer, common.F
 
     """
 
+    stale_recovery = None
+    """ :type: waiter.StaleRecovery|waiter.DelayedRecovery """
+    visibility_ttl = None
+
     def __init__(self, selector, timeout=None, name=None):
         super(PageElement, self).__init__(selector, name, timeout)
         self._parent = None
         self._id = None
+        self._epoch = None
         self.__cache = {}
         self._wait_ready_for_interaction = False
+        self._displayed = None
 
     def has_class(self, class_name):
         cls_attr = self.get_attribute('class')
         return False if cls_attr is None else re.search(r'(^|\s){}(\s|$)'.format(class_name), cls_attr) is not None
 
+    def snapshot(self):
+        """
+        Take snapshot of the element with one request, the element is the top element of the snapshot,
+        see ``dom`` module.
+
+        :rtype: dom.DomSnapshot
+        """
+        html, title, url = common.execute_script(self, scripts.SNAPSHOT)
+        return dom.DomSnapshot(html, url, title)
+
     def exists(self):
         """
         :return: True if element is present in the DOM, otherwise False.
                 Ignore implicit and element timeouts and execute immediately.
         """
-        t = self.wait_timeout
-        self.wait_timeout = 0
-        try:
-            self.reload()
-            return True
-        except NoSuchElementException:
-            return False
-        finally:
-            self.wait_timeout = t
+        with common.skip_wait(self):
+            try:
+                self.reload()
+                return True
+            except NoSuchElementException:
+                return False
 
     def is_displayed(self):
         """
@@ -104,18 +133,18 @@ class PageElement(common.BasePageElement, common.PageElementsContainer, common.F
 
         To wait when element displayed or not, use ``waiter.wait_displayed`` or ``waiter.wait_not_displayed``
         """
-        t = self.wait_timeout
-        self.wait_timeout = 0
-        try:
-            return super(PageElement, self).is_displayed()
-        except NoSuchElementException:
-            return False
-        finally:
-            self.wait_timeout = t
+        with common.skip_wait(self):
+            try:
+                displayed = super(PageElement, self).is_displayed()
+            except NoSuchElementException:
+                return False
+        if displayed:
+            self._seen_displayed()
+        return displayed
 
     @property
     def id(self):
-        if self._id is None:
+        if self._id is None or self._is_outdated():
             self.reload()
         return self._id
 
@@ -138,56 +167,157 @@ class PageElement(common.BasePageElement, common.PageElementsContainer, common.F
         super(PageElement, self).clear()
 
     def reload(self):
-        we = wait(common.find, self.wait_timeout, owner=self._owner, locator=self._locator)
+        if self.wait_timeout and waiter.wait_engine is not None and waiter.wait_engine.supports(self):
+            we = waiter.wait_engine.present(self, self.wait_timeout)
+        else:
+            # the element and its not found page blocks are searched by one command if it is possible
+            owner, locator = xpath.compile_chain(self)
+            we = waiter.Waiter(bool, counters=counters.of(self._parent)).start(
+                common.find, self.wait_timeout, owner=owner, locator=locator)
         if not we:
             raise NoSuchElementException("Element with selector {} was not found".format(self._locator))
+        self._set_found(we)
+
+    def _set_found(self, we):
         self._id = we.id
         self._parent = we.parent
-        self.__cache[self._owner] = self._id
+        self._epoch = _epoch_of(self._parent)
+        if _is_found(self._owner):
+            # owner found together with the element by compiled locator isn't loaded, it isn't searched for the cache
+            self.__cache[self._owner] = (self._id, self._epoch)
 
     def _fill_owner(self, owner):
         super(PageElement, self)._fill_owner(owner)
-        if self.__cached__ and self._id is not None:
-            self._id = self.__cache.get(self._owner)
+        if self.__cached__:
+            found = self.__cache.get(self._owner) if _is_found(self._owner) else None
+            self._id, self._epoch = found if found and found[1] == _epoch_of(self._parent) else (None, None)
+
+    def _is_outdated(self):
+        # the element was found before navigation or switch of frame or window
+        return self._epoch is not None and self._epoch != _epoch_of(self._parent)
+
+    def __copy__(self):
+        bound = super(PageElement, self).__copy__()
+        bound._wait_ready_for_interaction = False
+        return bound
 
     def _execute(self, command, params=None):
-        if not self.__cached__ or self._id is None:
+        if not self.__cached__ or self._id is None or self._is_outdated():
             self.reload()
 
         execute_attempts = 0
         while True:
+            checked = False
             try:
-                if self._wait_ready_for_interaction:
+                common.enter_frames(self._parent, common.frames_of(self))
+                if self._wait_ready_for_interaction and not self._is_seen_displayed():
                     self._wait_ready_for_interaction = False
-                    if not wait_displayed(self):
+                    if not waiter.wait_displayed(self):
                         raise ElementNotVisibleException("Element with selector {}".format(self._locator))
                     self._wait_ready_for_interaction = True
+                    self._seen_displayed()
+                    checked = True
                 val = super(PageElement, self)._execute(command, params)
                 return val
             except StaleElementReferenceException:
                 if execute_attempts > common.WAIT_STALE_ELEMENT_MAX_TRY:
                     raise
-                time.sleep(common.WAIT_ELEMENT_POLL_FREQUENCY)
-                self.reload()
+                waiter.recover_stale(self, execute_attempts)
+            except NOT_INTERACTABLE_ERRORS:
+                if not self._wait_ready_for_interaction or checked:
+                    raise
+                # visibility was taken from the cache, but the element has been hidden since
+                self._displayed = None
+                continue
             execute_attempts += 1
         return None
 
+    def _seen_displayed(self):
+        self._displayed = (self._id, time.time())
+
+    def _is_seen_displayed(self):
+        if self._displayed is None or self._displayed[0] != self._id:
+            return False
+        ttl = common.VISIBILITY_CACHE_TTL if self.visibility_ttl is None else self.visibility_ttl
+        return time.time() - self._displayed[1] < ttl
+
     def __hash__(self):
         return int(hashlib.md5(self.id).hexdigest(), 16)
 
 
+def _is_found(owner):
+    # page element is hashed by id, so not found owner would be searched to be used as a key of cache
+    return not isinstance(owner, PageElement) or owner._id is not None and not owner._is_outdated()
+
+
+def _epoch_of(driver):
+    return getattr(driver, "epoch", 0)
+
+
+class Frame(PageElement):
+    """
+    Page block for frame or iframe element, child elements are searched and used in the document of the frame.
+
+    The driver is switched into the frame (and its parent frames) before commands of the child elements
+    and back to the top document before commands of elements outside of frames.
+    Frames the driver is switched to are tracked, so switching commands are sent only when the frame changes.
+
+    Example:
+
+    class Editor(Frame):
+        body = PageElement("body")
+
+    class Page(object):
+        editor = Editor("#editor_frame")
+
+        def __init__(self, driver):
+            self.driver = driver
+
+    Page(driver).editor.body.send_keys("text")
+    """
+
+
+class ShadowRoot(PageElement):
+    """
+    Page block for shadow host element, child elements are searched in its open shadow root by a script.
+    XPath locators don't work inside of shadow roots, other locators are converted to CSS selectors.
+
+    Example:
+
+    class DatePicker(ShadowRoot):
+        input = PageElement("input.date")
+
+    class Page(object):
+        date = DatePicker("date-picker")
+    """
+
+
 class _ListItem(object):
+    # items of big lists are created in bulk, so they keep own state in slots
+    # and take selector and caching flag from the class
+    __slots__ = ("_container", "_index", "_id", "_epoch", "_parent", "_owner", "_w3c", "_name",
+                 "_wait_ready_for_interaction", "_displayed")
+
     def __init__(self, container, index):
         """
         :type container: PageElementsList
         :param container:
         :param index:
         """
-        # noinspection PyArgumentList
-        super(_ListItem, self).__init__("no_selector")
+        if self._default_init:
+            self._id = None
+            self._epoch = None
+            self._parent = None
+            self._owner = None
+            self._w3c = False
+            self._wait_ready_for_interaction = False
+            self._displayed = None
+        else:
+            # noinspection PyArgumentList
+            super(_ListItem, self).__init__("no_selector")
+            self.__cached__ = True
         self._container = container
         self._index = index
-        self.__cached__ = True
         self._name = "{0}[{1}]".format(container.name, index)
 
     def reload(self):
@@ -205,6 +335,28 @@ class _ListItem(object):
         self._container.wait_timeout = t
 
 
+_list_item_classes = {}
+
+
+def _list_item_class(el_class):
+    """
+    Returns class of list items for the element class, the class is created once per element class.
+    """
+    item_class = _list_item_classes.get(el_class)
+    if item_class is None:
+        default_init = six.get_unbound_function(el_class.__init__) is six.get_unbound_function(PageElement.__init__)
+        item_class = type("ListOf" + el_class.__name__, (_ListItem, el_class,), {
+            "__cached__": True,
+            "_locator": common.build_locator("no_selector"),
+            "_default_init": default_init,
+        })
+        _list_item_classes[el_class] = item_class
+    return item_class
+
+
+ItemRecord = collections.namedtuple("ItemRecord", "text displayed attributes")
+
+
 class PageElementsList(common.BasePageElement):
     """
     Provide list interface for list of page elements.
@@ -220,9 +372,17 @@ class PageElementsList(common.BasePageElement):
      assert Page().table_rows[1].is_displayed()  # second row is displayed
      Page().table_rows[0].find_elements('td')[2].click()  # click on third cell of first row
 
+    By default ``len()`` and iteration search elements of the list again each time.
+    In snapshot mode the list is searched once and stays stable until ``reload()``, ``invalidate()``
+    or stale reference of any element of the list:
+
+     with Page().table_rows.snapshot() as rows:
+        for i in range(len(rows)):
+            check_row(rows[i])
+
     """
 
-    def __init__(self, selector, el_class=PageElement, timeout=None, name=None):
+    def __init__(self, selector, el_class=PageElement, timeout=None, name=None, cached_length=False):
         """
         :type selector: tuple[str, str]|str
         :param selector:
@@ -230,35 +390,91 @@ class PageElementsList(common.BasePageElement):
         :param el_class:
         :type name: str
         :param name:
+        :type cached_length: bool
+        :param cached_length: always use snapshot mode
         :return:
         """
         super(PageElementsList, self).__init__(selector, name, timeout)
-        self._el_class = type("ListOf" + el_class.__name__ + uuid.uuid4().get_hex(), (_ListItem, el_class,), {})
+        self._el_class = _list_item_class(el_class)
+        self._cached_length = cached_length
+        self.__snapshots = 0
         self.__cache = {}
         self.__items = []
 
+    @contextlib.contextmanager
+    def snapshot(self):
+        """
+        Search the list once and use found elements inside the context
+        without searching them again on each ``len()``, iteration or index access.
+        """
+        self.reload()
+        self.__snapshots += 1
+        try:
+            yield self
+        finally:
+            self.__snapshots -= 1
+
+    def invalidate(self):
+        """
+        Forget found elements, so the list will be searched again on the next access.
+        """
+        self.__cache.pop(self._owner, None)
+
+    def _is_snapshot(self):
+        return self._cached_length or self.__snapshots > 0
+
+    def __cached_ids(self):
+        # ids found before navigation or switch of frame or window are not used
+        found = self.__cache.get(self._owner)
+        return found[0] if found and found[1] == _epoch_of(self._parent) else None
+
+    def __ensure_loaded(self):
+        if not self._is_snapshot() or self.__cached_ids() is None:
+            self.reload()
+
     def is_displayed(self):
         """
         :return: True id at least one element is displayed, otherwise False.
                 Ignore implicit and element timeouts and execute immediately.
         """
-        t = self.wait_timeout
-        self.wait_timeout = 0
-        try:
-            self.reload()
+        with common.skip_wait(self):
+            self.__ensure_loaded()
             return any(e.is_displayed() for e in self)
-        finally:
-            self.wait_timeout = t
+
+    def fetch(self, text=True, attrs=None, displayed=False):
+        """
+        Reload the list and read properties of all its elements with one script call
+        instead of separate request per element and property.
+
+        Visibility is checked by simplified script,
+        so in corner cases it may differ from result of ``is_displayed`` of the element.
+
+        Example:
+            texts = [r.text for r in Page().table_rows.fetch()]
+            links = [r.attributes['href'] for r in Page().links.fetch(text=False, attrs=['href'])]
+
+        :param text: read visible text of elements
+        :param attrs: names of attributes to read
+        :param displayed: check visibility of elements
+        :rtype: list[ItemRecord]
+        :return: records with ``None`` for not requested properties
+        """
+        attrs = list(attrs or [])
+        rows = waiter.wait(lambda: common.execute_script(self._owner, scripts.FETCH, list(self._locator),
+                                                         text, attrs, displayed), self.wait_timeout)
+        self._set_found([r[0] for r in rows])
+        return [ItemRecord(r[1], r[2], dict(zip(attrs, r[3])) if attrs else None) for r in rows]
 
     def reload(self):
-        # noinspection PyUnresolvedReferences
-        # noinspection PySuperArguments
-        l = wait(lambda: super(common.FindOverride, self._owner).find_elements(*self._locator), self.wait_timeout)
-        cache = [w.id for w in l]
-        self.__initialize_elements(cache)
-        self.__cache[self._owner] = cache
-
-    def __initialize_elements(self, items):
+        self._set_found(waiter.wait(lambda: common.find_all(self._owner, self._locator), self.wait_timeout))
+
+    def _set_found(self, web_elements):
+        cache = [w.id for w in web_elements]
+        epoch = _epoch_of(self._parent)
+        self.__initialize_elements(cache, epoch)
+        self.__cache[self._owner] = (cache, epoch)
+
+    def __initialize_elements(self, items, epoch):
         new_len = len(items)
         old_len = len(self.__items)
         if new_len > old_len:
@@ -266,29 +482,39 @@ class PageElementsList(common.BasePageElement):
         else:
             del self.__items[new_len:]
         for e, l in zip(self.__items, items):
-            setattr(e, "_id", l), setattr(e, "_parent", self._parent)
+            setattr(e, "_id", l), setattr(e, "_epoch", epoch), setattr(e, "_parent", self._parent)
             setattr(e, "_w3c", self._w3c), setattr(e, "_owner", self._owner)
 
     def _fill_owner(self, owner):
         super(PageElementsList, self)._fill_owner(owner)
-        if self.__cached__ and self._owner in self.__cache:
-            self.__initialize_elements(self.__cache[self._owner])
+        if self.__cached__ and _is_found(self._owner):
+            ids = self.__cached_ids()
+            if ids is not None:
+                self.__initialize_elements(ids, _epoch_of(self._parent))
+
+    def __copy__(self):
+        bound = super(PageElementsList, self).__copy__()
+        bound.__items = []
+        bound.__snapshots = 0
+        return bound
 
     def __len__(self):
-        self.reload()
+        self.__ensure_loaded()
         return len(self.__items)
 
     def __getitem__(self, index):
-        if not self.__cached__ or self._owner not in self.__cache:
+        if not self.__cached__ or self.__cached_ids() is None:
             self.reload()
         try:
             return self.__items[index]
         except IndexError:
+            if self._is_snapshot():
+                raise
             self.reload()
             return self.__items[index]
 
     def __iter__(self):
-        self.reload()
+        self.__ensure_loaded()
         i = 0
         while True:
             try:
@@ -311,3 +537,7 @@ class VirtualElement(common.BasePageElement, common.PageElementsContainer, commo
     def reload(self):
         raise TypeError("VirtualElementsGroup is not supposed to be reloaded, "
                         "it doesn't have corresponding DOM element ")
+
+
+import dom
+import xpath
@@ -0,0 +1,287 @@
+"""
+In-process webdriver for tests and benchmarks without a browser.
+
+HTML fixture is parsed to a simulated DOM (see ``dom`` module), commands are executed locally
+with configurable latency, stale element errors may be injected:
+
+    driver = FakeDriver(html, latency=0.005)  # each command takes 5 ms like a local browser
+    driver.inject_stale(2)  # next two commands with elements fail with StaleElementReferenceException
+    page = MyPage(driver)
+    page.button.click()
+    print driver.counters.command_count
+
+Supported commands: search of elements, reading of text, attributes and states, click, clear, send_keys,
+navigation to urls of ``pages`` (other urls keep current DOM) and the scripts of the library
+(prefetch, list fetch, form filling, snapshots and waiting in browser). Other scripts are rejected.
+Click and typing change attributes of the simulated DOM, events and page scripts are not simulated.
+Frames and shadow roots are not simulated either: switching commands are accepted,
+children of frames and shadow hosts are searched in the same DOM.
+The DOM may be changed directly by ``node(selector)``, e.g. from a timer to simulate a delayed rendering.
+"""
+import copy
+import time
+import xml.etree.ElementTree as ET
+
+import six
+from selenium.common.exceptions import ElementNotVisibleException, StaleElementReferenceException, \
+    WebDriverException
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.switch_to import SwitchTo
+from selenium.webdriver.remote.webelement import WebElement
+
+import common
+import counters
+import dom
+import scripts
+import webdrivers
+
+
+class FakeDriver(dom.DomSnapshot):
+    def __init__(self, html, url="http://fake/", pages=None, latency=0, command_latency=None, stale_every=0):
+        """
+        :param html: html of the current page
+        :param pages: dict url -> html of pages opened by ``get``
+        :param latency: seconds each command takes
+        :param command_latency: dict command -> seconds, overrides ``latency`` for the commands
+        :param stale_every: each n-th command with an element fails with StaleElementReferenceException
+        """
+        super(FakeDriver, self).__init__(html, url)
+        self.session_id = self.session_id.replace("snapshot", "fake")
+        self.pages = pages or {}
+        self.latency = latency
+        self.command_latency = command_latency or {}
+        self.stale_every = stale_every
+        self.__stale_pending = 0
+        self.__element_commands = 0
+        self._switch_to = SwitchTo(self)
+
+    @property
+    def is_static(self):
+        return False
+
+    def inject_stale(self, count=1):
+        """
+        Next ``count`` commands with elements fail with StaleElementReferenceException,
+        the elements get new ids when they are found again.
+        """
+        self.__stale_pending += count
+
+    def node(self, selector):
+        """
+        :return: node of the simulated DOM to change it directly
+        :rtype: xml.etree.ElementTree.Element
+        """
+        found = dom.find(self.document, *(common.build_locator(selector) + (self._parents,)))
+        return found[0] if found else None
+
+    def execute(self, driver_command, params=None):
+        self._on_command(driver_command)
+        start = counters.clock()
+        try:
+            delay = self.command_latency.get(driver_command, self.latency)
+            if delay:
+                time.sleep(delay)
+            if params and "id" in params and self.__is_stale():
+                self._forget(params["id"])
+                raise StaleElementReferenceException("Element {} is stale".format(params["id"]))
+            return super(FakeDriver, self).execute(driver_command, params)
+        finally:
+            self.counters.command(driver_command, counters.clock() - start)
+
+    def snapshot(self):
+        # the snapshot is taken by the script as by a real driver
+        return webdrivers.WebDriverBase.snapshot(self)
+
+    def _forget(self, element_id):
+        el = self._elements.pop(element_id, None)
+        if el is not None:
+            del self._element_ids[el]
+
+    def _element(self, params):
+        try:
+            return self._elements[params["id"]]
+        except KeyError:
+            raise StaleElementReferenceException("Element {} is stale".format(params["id"]))
+
+    def __is_stale(self):
+        self.__element_commands += 1
+        if self.__stale_pending:
+            self.__stale_pending -= 1
+            return True
+        return bool(self.stale_every) and self.__element_commands % self.stale_every == 0
+
+    # commands changing the page
+    def _get(self, params):
+        self.url = params["url"]
+        if self.url in self.pages:
+            self._load(self.pages[self.url])
+
+    def _click(self, params):
+        el = self.__interactable(params)
+        if el.tag == "input" and el.get("type", "").lower() == "checkbox":
+            _set_flag(el, "checked", "checked" not in el.attrib)
+        elif el.tag == "input" and el.get("type", "").lower() == "radio":
+            self.__check_radio(el)
+        elif el.tag == "option":
+            self.__select_option(el, "selected" not in el.attrib)
+
+    def _clear(self, params):
+        _set_value(self.__interactable(params), "")
+
+    def _send_keys(self, params):
+        el = self.__interactable(params)
+        _set_value(el, (dom.value(el) or "") + "".join(params.get("value") or params.get("text", "")))
+
+    def _nothing(self, params):
+        return None
+
+    def __interactable(self, params):
+        el = self._element(params)
+        if not self._displayed(el):
+            raise ElementNotVisibleException("Element {} is not displayed".format(params["id"]))
+        return el
+
+    def __check_radio(self, el):
+        name = el.get("name")
+        for other in self.document.iter("input"):
+            if other is not el and name and other.get("name") == name:
+                _set_flag(other, "checked", False)
+        _set_flag(el, "checked", True)
+
+    def __select_option(self, option, selected):
+        select = self._parents.get(option)
+        while select is not None and select.tag != "select":
+            select = self._parents.get(select)
+        if selected and select is not None and "multiple" not in select.attrib:
+            for other in select.iter("option"):
+                _set_flag(other, "selected", False)
+        _set_flag(option, "selected", selected or (select is not None and "multiple" not in select.attrib))
+
+    # scripts of the library
+    def _execute_script(self, params):
+        handler = self._scripts.get(params["script"])
+        if handler is None:
+            raise WebDriverException("Script is not supported by fake driver: {}".format(params["script"][:100]))
+        return handler(self, *params.get("args", []))
+
+    def __context(self, root):
+        if isinstance(root, list):
+            # shadow DOM is not simulated, children of the shadow host are searched instead
+            root = root[0]
+        return self.document if root is None else self._element({"id": root.id})
+
+    def _find_all_script(self, root, locators):
+        found = []
+        for by, value, many, parent in locators:
+            context = self.__context(root) if parent < 0 else found[parent]
+            if context is None:
+                found.append(None)
+                continue
+            if isinstance(context, WebElement):
+                context = self._element({"id": context.id})
+            elements = dom.find(context, by, value, self._parents)
+            found.append([self._wrap(e) for e in elements] if many else
+                         self._wrap(elements[0]) if elements else None)
+        return found
+
+    def _fetch_script(self, root, locator, with_text, attrs, visibility):
+        records = []
+        for el in dom.find(self.__context(root), locator[0], locator[1], self._parents):
+            we = self._wrap(el)
+            records.append([we, dom.text(el) if with_text else None, self._displayed(el) if visibility else None,
+                            [self._attribute({"id": we.id, "name": name}) for name in attrs]])
+        return records
+
+    def _fill_script(self, root, locators, values, fill):
+        result = []
+        for (by, selector), value in zip(locators, values):
+            found = dom.find(self.__context(root), by, selector, self._parents)
+            el = found[0] if found else None
+            filled = el is not None and fill and "disabled" not in el.attrib and "readonly" not in el.attrib
+            if filled:
+                if isinstance(value, bool):
+                    _set_flag(el, "checked", value)
+                elif el.tag == "select":
+                    wanted = [six.text_type(v) for v in (value if isinstance(value, (list, tuple)) else [value])]
+                    for option in el.iter("option"):
+                        _set_flag(option, "selected", dom.value(option) in wanted or
+                                  " ".join("".join(option.itertext()).split()) in wanted)
+                else:
+                    _set_value(el, six.text_type(value))
+            result.append([None if el is None else self._wrap(el), filled])
+        return result
+
+    def _snapshot_script(self, root):
+        if root is None:
+            html = "".join(_serialize(el) for el in self.document)
+        else:
+            html = _serialize(self.__context(root))
+        return [html, self._title_command({}), self.url]
+
+    def _wait_script(self, root, locator, mode, timeout):
+        # the browser reacts on changes of DOM, the fake driver checks it frequently
+        end_time = time.time() + timeout / 1000.0
+        while True:
+            found = dom.find(self.__context(root), locator[0], locator[1], self._parents)
+            el = found[0] if found else None
+            if mode == "present":
+                done = el is not None
+            else:
+                visible = el is not None and self._displayed(el)
+                done = visible if mode == "displayed" else not visible
+            if done or time.time() >= end_time:
+                return [done, None if el is None else self._wrap(el)]
+            time.sleep(0.005)
+
+    _scripts = {
+        scripts.FIND_ALL: _find_all_script,
+        scripts.FETCH: _fetch_script,
+        scripts.FILL: _fill_script,
+        scripts.SNAPSHOT: _snapshot_script,
+        scripts.WAIT: _wait_script,
+    }
+
+    _handlers = dict(dom.DomSnapshot._handlers)
+    _handlers.update({
+        Command.GET: _get,
+        Command.CLICK_ELEMENT: _click,
+        Command.CLEAR_ELEMENT: _clear,
+        Command.SEND_KEYS_TO_ELEMENT: _send_keys,
+        Command.SUBMIT_ELEMENT: _nothing,
+        Command.EXECUTE_SCRIPT: _execute_script,
+        Command.EXECUTE_ASYNC_SCRIPT: _execute_script,
+        Command.REFRESH: _nothing,
+        Command.GO_BACK: _nothing,
+        Command.GO_FORWARD: _nothing,
+        Command.SET_SCRIPT_TIMEOUT: _nothing,
+        Command.SET_TIMEOUTS: _nothing,
+        Command.IMPLICIT_WAIT: _nothing,
+        Command.DELETE_ALL_COOKIES: _nothing,
+        Command.SWITCH_TO_FRAME: _nothing,
+        Command.SWITCH_TO_PARENT_FRAME: _nothing,
+        Command.SWITCH_TO_WINDOW: _nothing,
+        Command.CLOSE: _nothing,
+        Command.QUIT: _nothing,
+    })
+
+
+def _set_flag(el, name, value):
+    if value:
+        el.set(name, "")
+    else:
+        el.attrib.pop(name, None)
+
+
+def _set_value(el, value):
+    if el.tag == "textarea":
+        del el[:]
+        el.text = value
+    else:
+        el.set("value", value)
+
+
+def _serialize(el):
+    el = copy.copy(el)
+    el.tail = None
+    html = ET.tostring(el, method="html")
+    return html.decode("utf-8") if isinstance(html, bytes) else html
@@ -44,9 +44,14 @@ for example, it may be used for specifying of custom log message format, like
                 print '{my_element}.{step_name}({args}, {fkwargs})'.format(**options)
 """
 
+import atexit
 import functools
+import itertools
 import sys
-import uuid
+import threading
+import traceback
+
+from six.moves import queue
 
 __All__ = ["step", "listeners", "message", "action", "debug"]
 
@@ -79,6 +84,137 @@ listeners = []
 """ :type: list[ListenerMixin] """
 
 
+class AsyncDispatcher(ListenerMixin):
+    """
+    Listener that passes events to wrapped listeners on a background thread,
+    so slow listeners (files, screenshots, uploads) don't block the test thread.
+
+    Events are put to a queue of ``max_size`` and delivered in batches of up to ``batch_size`` in the same order,
+    so events of each step are delivered in order of its occurrence.
+    Remaining events are delivered on ``close()``, which is called automatically on exit.
+
+    If the queue is full, ``overflow`` policy is applied:
+     - BLOCK - wait until there is free place in the queue
+     - DROP - skip new steps and messages
+     - SAMPLE - skip new steps and messages except each ``sample_every``-th one
+
+    Started step is always finished: events of skipped steps are skipped,
+    end and exception events of delivered steps are never skipped.
+
+    Example:
+        log2l.listeners.append(AsyncDispatcher([MyLogger()], overflow=AsyncDispatcher.DROP))
+    """
+    BLOCK = "block"
+    DROP = "drop"
+    SAMPLE = "sample"
+
+    __stop = object()
+
+    def __init__(self, targets, max_size=1000, batch_size=100, overflow=BLOCK, sample_every=10):
+        """
+        :type targets: list[ListenerMixin]
+        """
+        if overflow not in (self.BLOCK, self.DROP, self.SAMPLE):
+            raise ValueError("unknown overflow policy: {}".format(overflow))
+        self.targets = list(targets)
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.sample_every = sample_every
+        self.skipped = 0
+        self.__overflows = 0
+        self.__skipped_steps = set()
+        self.__queue = queue.Queue(max_size)
+        self.__thread = threading.Thread(target=self.__run, name="log2l-dispatcher")
+        self.__thread.daemon = True
+        self.__thread.start()
+        atexit.register(self.close)
+
+    def start_step(self, step_id, **options):
+        if self.__skip():
+            self.__skipped_steps.add(step_id)
+        else:
+            self.__put("start_step", (step_id,), options)
+
+    def end_step(self, step_id, **options):
+        if step_id in self.__skipped_steps:
+            self.__skipped_steps.discard(step_id)
+        else:
+            self.__put("end_step", (step_id,), options)
+
+    def exception(self, step_id, err, **options):
+        if step_id not in self.__skipped_steps:
+            self.__put("exception", (step_id, err), options)
+
+    def message(self, msg, **kwargs):
+        if not self.__skip():
+            self.__put("message", (msg,), kwargs)
+
+    def flush(self):
+        """
+        Wait until all queued events are delivered.
+        """
+        if self.__thread.is_alive():
+            self.__queue.join()
+
+    def close(self):
+        """
+        Deliver queued events and stop the background thread.
+        Events received after closing are delivered immediately on the caller thread.
+        """
+        if self.__thread.is_alive():
+            self.__queue.put(self.__stop)
+            self.__thread.join()
+        # events put by other threads while the dispatcher was stopping
+        while True:
+            try:
+                event = self.__queue.get_nowait()
+            except queue.Empty:
+                return
+            if event is not self.__stop:
+                self.__deliver(*event)
+
+    def __skip(self):
+        if self.overflow == self.BLOCK or not self.__queue.full():
+            return False
+        self.__overflows += 1
+        if self.overflow == self.SAMPLE and self.__overflows % self.sample_every == 0:
+            return False
+        self.skipped += 1
+        return True
+
+    def __put(self, name, args, kwargs):
+        if self.__thread.is_alive():
+            self.__queue.put((name, args, kwargs))
+        else:
+            self.__deliver(name, args, kwargs)
+
+    def __run(self):
+        while True:
+            batch = [self.__queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.__queue.get_nowait())
+            except queue.Empty:
+                pass
+            stop = False
+            for event in batch:
+                if event is self.__stop:
+                    stop = True
+                else:
+                    self.__deliver(*event)
+                self.__queue.task_done()
+            if stop:
+                return
+
+    def __deliver(self, name, args, kwargs):
+        for l in self.targets:
+            try:
+                getattr(l, name)(*args, **kwargs)
+            except Exception:
+                # there is nobody to catch it on the background thread
+                traceback.print_exc()
+
+
 # noinspection PyPep8Naming
 class step(object):
     def __new__(cls, *args, **kwargs):
@@ -128,24 +264,27 @@ def attach(msg, contents, *args, **kwargs):
 
 
 def message(msg, **kwargs):
-    [l.message(msg, **kwargs) for l in listeners]
+    for l in listeners:
+        l.message(msg, **kwargs)
 
 
 def _decorator(method, step_options):
     step_options.setdefault(Options.STEP_NAME, method.func_name)
+    # options of the step are the same for each call, only element name and arguments are added
+    static_options = step_options.items()
 
     @functools.wraps(method)
     def wrapper(*args, **kwargs):
-        options = step_options.copy()
-        fargs = args
+        if not listeners:
+            return method(*args, **kwargs)
+        options = {Options.KWARGS: kwargs, Options.ARGS: args}
         if len(args) > 0 and hasattr(args[0], "_name"):
             # noinspection PyProtectedMember
-            options.setdefault(Options.ELEMENT_NAME, args[0]._name)
-        options.setdefault(Options.KWARGS, kwargs)
-        options.setdefault(Options.ARGS, args)
+            options[Options.ELEMENT_NAME] = args[0]._name
+        options.update(static_options)
         step_id = _notify_start(**options)
         try:
-            return method(*fargs, **kwargs)
+            return method(*args, **kwargs)
         except Exception:
             _notify_exception(step_id, sys.exc_info())
             raise
@@ -155,15 +294,22 @@ def _decorator(method, step_options):
     return wrapper
 
 
+# itertools.count is thread safe in CPython, that is enough for unique ids
+_step_ids = itertools.count(1)
+
+
 def _notify_start(**options):
-    step_id = uuid.uuid4()
-    [l.start_step(step_id, **options) for l in listeners]
+    step_id = next(_step_ids)
+    for l in listeners:
+        l.start_step(step_id, **options)
     return step_id
 
 
 def _notify_end(step_id, **options):
-    [l.end_step(step_id, **options) for l in listeners]
+    for l in listeners:
+        l.end_step(step_id, **options)
 
 
 def _notify_exception(step_id, err, **options):
-    [l.exception(step_id, err, **options) for l in listeners]
+    for l in listeners:
+        l.exception(step_id, err, **options)
@@ -0,0 +1,131 @@
+"""
+Parallel execution of independent checks of page objects.
+
+Read only operations of different page elements may be executed in parallel threads of one session,
+each command is sent by own HTTP request (with the default command executor of selenium without keep alive),
+so the time of a check is the time of the slowest one instead of the sum:
+
+    results = parallel_map(lambda item: item.text, Page(driver).items, workers=8)
+    texts = [r.get() for r in results]
+
+Work may be spread over several sessions, each driver is used by one thread:
+
+    drivers = [get_driver("chrome") for _ in range(4)]
+    results = parallel_map(lambda driver, tenant: check_tenant(driver, tenant), tenants, drivers=drivers)
+
+Each task gets log2l steps executed by it (see ``tracing.Span``) and the exception if it failed,
+exceptions of tasks don't stop other tasks.
+Page elements shouldn't be changed by several tasks at once (e.g. typed into or used inside of frames).
+``exists`` and ``is_displayed`` skip waiting only in own thread (see ``common.skip_wait``),
+so elements shared by tasks keep their timeouts.
+"""
+import sys
+import threading
+
+import six
+from six.moves import queue
+
+import log2l
+import tracing
+
+DEFAULT_WORKERS = 4
+
+
+class TaskResult(object):
+    __slots__ = ("item", "value", "exc_info", "steps")
+
+    def __init__(self, item):
+        self.item = item
+        self.value = None
+        self.exc_info = None
+        self.steps = []
+        """ :type: list[tracing.Span] root steps of the task """
+
+    @property
+    def error(self):
+        return None if self.exc_info is None else self.exc_info[1]
+
+    def get(self):
+        """
+        :return: value returned by the task, the exception of the task is raised again if it failed
+        """
+        if self.exc_info is not None:
+            six.reraise(*self.exc_info)
+        return self.value
+
+
+def parallel_map(func, items, workers=None, drivers=None, collect_steps=True):
+    """
+    Call ``func(item)`` for each item in parallel threads,
+    or ``func(driver, item)`` if ``drivers`` are specified, then each driver is used by one thread.
+
+    :param workers: number of threads if drivers are not specified, ``DEFAULT_WORKERS`` by default
+    :param drivers: drivers to spread items over
+    :param collect_steps: collect log2l steps of each task
+    :rtype: list[TaskResult]
+    :return: results in order of items
+    """
+    results = [TaskResult(item) for item in items]
+    if not results:
+        return results
+    tasks = queue.Queue()
+    for result in results:
+        tasks.put(result)
+    if drivers:
+        contexts = [(driver,) for driver in drivers]
+    else:
+        contexts = [()] * max(min(workers or DEFAULT_WORKERS, len(results)), 1)
+    listener = _TaskSteps() if collect_steps else None
+    if listener is not None:
+        log2l.listeners.append(listener)
+    try:
+        threads = [threading.Thread(target=_work, args=(func, args, tasks, listener), name="parallel-{}".format(i))
+                   for i, args in enumerate(contexts)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        if listener is not None:
+            log2l.listeners.remove(listener)
+    return results
+
+
+def _work(func, args, tasks, listener):
+    while True:
+        try:
+            result = tasks.get_nowait()
+        except queue.Empty:
+            return
+        tracer = None
+        if listener is not None:
+            tracer = listener.local.tracer = tracing.StepTracer()
+        try:
+            result.value = func(*(args + (result.item,)))
+        except Exception:
+            result.exc_info = sys.exc_info()
+        finally:
+            if tracer is not None:
+                listener.local.tracer = None
+                result.steps = tracer.spans
+
+
+class _TaskSteps(log2l.ListenerMixin):
+    # passes steps of each thread to the tracer of the current task of the thread
+    def __init__(self):
+        self.local = threading.local()
+
+    def start_step(self, step_id, **options):
+        tracer = getattr(self.local, "tracer", None)
+        if tracer is not None:
+            tracer.start_step(step_id, **options)
+
+    def end_step(self, step_id, **options):
+        tracer = getattr(self.local, "tracer", None)
+        if tracer is not None:
+            tracer.end_step(step_id, **options)
+
+    def exception(self, step_id, err, **options):
+        tracer = getattr(self.local, "tracer", None)
+        if tracer is not None:
+            tracer.exception(step_id, err, **options)
@@ -0,0 +1,258 @@
+"""
+JavaScript snippets executed in the browser to save WebDriver round trips.
+
+Locators are passed to the browser as ``[by, value]`` pairs produced by ``common.build_locator``,
+so all selector types known by WebDriver are supported.
+"""
+
+# find(context, by, value, many) -> element | null | [element]
+# context is an element or a document, by and value are WebDriver locator parts
+FIND = """function (ctx, by, value, many) {
+    var doc = ctx.ownerDocument || ctx, nodes = [], i, css;
+    function quote(s) { return String(s).replace(/(["\\\\])/g, '\\\\$1'); }
+    if (by === 'xpath') {
+        var type = many ? XPathResult.ORDERED_NODE_SNAPSHOT_TYPE : XPathResult.FIRST_ORDERED_NODE_TYPE;
+        var r = doc.evaluate(value, ctx, null, type, null);
+        if (!many) {
+            return r.singleNodeValue;
+        }
+        for (i = 0; i < r.snapshotLength; i++) {
+            nodes.push(r.snapshotItem(i));
+        }
+        return nodes;
+    }
+    if (by === 'link text' || by === 'partial link text') {
+        var links = ctx.querySelectorAll('a');
+        for (i = 0; i < links.length; i++) {
+            var text = (links[i].innerText || links[i].textContent || '').trim();
+            if (by === 'link text' ? text === value : text.indexOf(value) >= 0) {
+                if (!many) {
+                    return links[i];
+                }
+                nodes.push(links[i]);
+            }
+        }
+        return many ? nodes : null;
+    }
+    if (by === 'id') {
+        css = '[id="' + quote(value) + '"]';
+    } else if (by === 'name') {
+        css = '[name="' + quote(value) + '"]';
+    } else if (by === 'class name') {
+        css = '.' + (window.CSS && CSS.escape ? CSS.escape(value) : value);
+    } else {
+        css = value;
+    }
+    return many ? Array.prototype.slice.call(ctx.querySelectorAll(css)) : ctx.querySelector(css);
+}"""
+
+# root(argument) -> element, shadow root or document
+# scripts searching elements get [host] instead of root element to search inside the shadow root of the host
+ROOT = """function (r) {
+    return !r ? document : r instanceof Array ? r[0].shadowRoot : r;
+}"""
+
+# arguments: root element or null for document, list of [by, value, many, parent_index]
+# parent_index refers to previously resolved entry or is -1 for root.
+# returns list with element, null or list of elements for each entry
+FIND_ALL = """var find = """ + FIND + """;
+var root = (""" + ROOT + """)(arguments[0]), locators = arguments[1], found = [];
+for (var i = 0; i < locators.length; i++) {
+    var l = locators[i], ctx = l[3] < 0 ? root : found[l[3]];
+    found.push(ctx ? find(ctx, l[0], l[1], l[2]) : null);
+}
+return found;
+"""
+
+# displayed(element) -> bool
+# simplified visibility check, it doesn't cover all corner cases of WebDriver ``isElementDisplayed``
+DISPLAYED = """function (el) {
+    var style = window.getComputedStyle(el), rect = el.getBoundingClientRect();
+    return style.visibility !== 'hidden' && style.visibility !== 'collapse' && style.opacity !== '0'
+        && rect.width > 0 && rect.height > 0;
+}"""
+
+# attribute(element, name) -> property value if it is a primitive, otherwise value of the attribute
+ATTRIBUTE = """function (el, name) {
+    var value = el[name];
+    return value === undefined || value === null || typeof value === 'object' || typeof value === 'function'
+        ? el.getAttribute(name) : value;
+}"""
+
+# arguments: root element or null for document, [by, value], text flag, list of attribute names, displayed flag
+# returns list of [element, text, displayed, [attribute values]] for each found element
+FETCH = """var find = """ + FIND + """, displayed = """ + DISPLAYED + """, attribute = """ + ATTRIBUTE + """;
+var root = (""" + ROOT + """)(arguments[0]), locator = arguments[1], text = arguments[2], attrs = arguments[3],
+    visibility = arguments[4], els = find(root, locator[0], locator[1], true), records = [];
+for (var i = 0; i < els.length; i++) {
+    var el = els[i], values = [];
+    for (var j = 0; j < attrs.length; j++) {
+        values.push(attribute(el, attrs[j]));
+    }
+    records.push([el, text ? (el.innerText || '').trim() : null, visibility ? displayed(el) : null, values]);
+}
+return records;
+"""
+
+# asynchronous script
+# arguments: root element or null for document, [by, value], mode, timeout in milliseconds
+# mode is one of 'present', 'displayed', 'hidden'
+# returns [true, element or null] as soon as the condition is met, otherwise [false, element or null] after timeout
+WAIT = """var find = """ + FIND + """, displayed = """ + DISPLAYED + """;
+var root = (""" + ROOT + """)(arguments[0]), locator = arguments[1], mode = arguments[2], timeout = arguments[3],
+    done = arguments[arguments.length - 1], finished = false, observer = null, timer = null, poll = null;
+function check() {
+    var el = find(root, locator[0], locator[1], false);
+    if (mode === 'present') {
+        return [!!el, el];
+    }
+    var visible = !!el && displayed(el);
+    return [mode === 'displayed' ? visible : !visible, el];
+}
+function finish(result) {
+    if (!finished) {
+        finished = true;
+        if (observer) {
+            observer.disconnect();
+        }
+        clearTimeout(timer);
+        clearInterval(poll);
+        done(result);
+    }
+}
+function test() {
+    var result = check();
+    if (result[0]) {
+        finish(result);
+    }
+}
+var first = check();
+if (first[0] || timeout <= 0) {
+    finish(first);
+} else {
+    observer = new MutationObserver(test);
+    observer.observe(root, {childList: true, subtree: true, attributes: true, characterData: true});
+    // styles may be changed without DOM mutations, e.g. by transitions
+    poll = setInterval(test, 100);
+    timer = setTimeout(function () { finish(check()); }, timeout);
+}
+"""
+
+# arguments: root element or null for document, list of [by, value], list of values, fill flag
+# value is a string or a number for text inputs, a boolean for checkboxes and radio buttons,
+# a value or a text of option (or list of them for multiple select) for selects.
+# Value is set like a user does it: the element is focused, value is changed, 'input' and 'change' events are fired.
+# Elements are only found if fill flag is false.
+# returns list of [element or null, filled flag], fields which are not filled should be filled by webdriver
+FILL = """var find = """ + FIND + """;
+var root = (""" + ROOT + """)(arguments[0]), locators = arguments[1], values = arguments[2], fill = arguments[3],
+    result = [];
+function fire(el, type) {
+    var event = document.createEvent('HTMLEvents');
+    event.initEvent(type, true, false);
+    el.dispatchEvent(event);
+}
+function setValue(el, value) {
+    // native setter is used, so frameworks that track value property (e.g. React) see the change
+    var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+}
+function fillSelect(el, value) {
+    var wanted = [].concat(value).map(String), matched = [], i, o;
+    for (i = 0; i < el.options.length; i++) {
+        o = el.options[i];
+        if (wanted.indexOf(o.value) >= 0 || wanted.indexOf((o.text || '').trim()) >= 0) {
+            matched.push(o);
+        }
+    }
+    if (!matched.length || (!el.multiple && wanted.length > 1)) {
+        return false;
+    }
+    for (i = 0; i < el.options.length; i++) {
+        o = el.options[i];
+        if (el.multiple || matched[0] === o) {
+            o.selected = matched.indexOf(o) >= 0;
+        }
+    }
+    fire(el, 'input');
+    fire(el, 'change');
+    return true;
+}
+function fillOne(el, value) {
+    var tag = el.tagName, type = (el.type || '').toLowerCase();
+    if (el.disabled || el.readOnly) {
+        return false;
+    }
+    if (tag === 'SELECT') {
+        return typeof value !== 'boolean' && fillSelect(el, value);
+    }
+    if (tag === 'INPUT' && (type === 'checkbox' || type === 'radio')) {
+        if (typeof value !== 'boolean') {
+            return false;
+        }
+        if (el.checked !== value) {
+            if (value || type === 'checkbox') {
+                // click fires click, input and change events as user's click does
+                el.click();
+            } else {
+                el.checked = false;
+                fire(el, 'input');
+                fire(el, 'change');
+            }
+        }
+        return el.checked === value;
+    }
+    if ((tag === 'INPUT' && type !== 'file') || tag === 'TEXTAREA') {
+        if (typeof value === 'boolean' || value instanceof Array) {
+            return false;
+        }
+        el.focus();
+        setValue(el, String(value));
+        fire(el, 'input');
+        fire(el, 'change');
+        el.blur();
+        return true;
+    }
+    return false;
+}
+for (var i = 0; i < locators.length; i++) {
+    var el = find(root, locators[i][0], locators[i][1], false);
+    result.push([el, !!el && fill && fillOne(el, values[i])]);
+}
+return result;
+"""
+
+# arguments: element ([host] for shadow host) or null for document
+# returns [html, title, url], html of the element (of the whole document) contains current values of form fields
+# as attributes, elements hidden by styles are marked by 'data-snapshot-hidden' attribute: 'none' for not displayed
+# elements (with descendants), 'hidden' for invisible elements
+SNAPSHOT = """var root = arguments[0] instanceof Array ? arguments[0][0] : arguments[0] || document.documentElement,
+    copy = root.cloneNode(true),
+    originals = [root].concat(Array.prototype.slice.call(root.getElementsByTagName('*'))),
+    copies = [copy].concat(Array.prototype.slice.call(copy.getElementsByTagName('*')));
+for (var i = 0; i < originals.length; i++) {
+    var el = originals[i], c = copies[i], style = window.getComputedStyle(el), tag = el.tagName.toUpperCase();
+    if (style && style.display === 'none') {
+        c.setAttribute('data-snapshot-hidden', 'none');
+    } else if (style && (style.visibility === 'hidden' || style.visibility === 'collapse')) {
+        c.setAttribute('data-snapshot-hidden', 'hidden');
+    }
+    if (tag === 'INPUT') {
+        c.setAttribute('value', el.value);
+        if (el.checked) {
+            c.setAttribute('checked', '');
+        } else {
+            c.removeAttribute('checked');
+        }
+    } else if (tag === 'TEXTAREA') {
+        c.textContent = el.value;
+    } else if (tag === 'OPTION') {
+        if (el.selected) {
+            c.setAttribute('selected', '');
+        } else {
+            c.removeAttribute('selected');
+        }
+    }
+}
+return [copy.outerHTML, document.title, document.location.href];
+"""
@@ -0,0 +1,199 @@
+"""
+Tracing of log2l steps with durations.
+
+    tracer = StepTracer()
+    log2l.listeners.append(tracer)
+    ... run tests ...
+    tracer.save_json("steps.json")  # tree of steps and statistics per element and step
+    tracer.save_chrome_trace("steps.trace.json")  # open in chrome://tracing or https://ui.perfetto.dev
+
+Statistics are collected per pair of element name and step name:
+count, total and self (without nested steps) time, 50, 95 and 99 percentiles and maximum of durations.
+
+Steps nested into ``action`` steps are not traced, their time is attributed to the action.
+The tracer measures time when it is notified, so it should be added to ``log2l.listeners`` directly,
+not through ``log2l.AsyncDispatcher``.
+"""
+import json
+import math
+import os
+import threading
+import time
+
+import log2l
+
+# time.monotonic is not available in python 2
+clock = getattr(time, "monotonic", time.time)
+
+
+class Span(object):
+    __slots__ = ("step_id", "name", "element_name", "step_name", "thread", "start", "end", "error", "children",
+                 "suppress_children")
+
+    def __init__(self, step_id, options):
+        self.step_id = step_id
+        self.step_name = options.get(log2l.Options.STEP_NAME)
+        self.element_name = options.get(log2l.Options.ELEMENT_NAME)
+        self.name = options.get(log2l.Options.STEP_MESSAGE) or self.step_name
+        self.suppress_children = bool(options.get(log2l.Options.SUPPRESS_CHILD_LOGS))
+        self.thread = threading.current_thread().name
+        self.start = clock()
+        self.end = None
+        self.error = None
+        self.children = []
+
+    @property
+    def duration(self):
+        return (clock() if self.end is None else self.end) - self.start
+
+    @property
+    def self_duration(self):
+        return self.duration - sum(c.duration for c in self.children)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "element_name": self.element_name,
+            "step_name": self.step_name,
+            "thread": self.thread,
+            "duration": self.duration,
+            "error": self.error,
+            "children": [c.to_dict() for c in self.children],
+        }
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile of sorted ``values``.
+    """
+    if not values:
+        return None
+    return values[max(int(math.ceil(p / 100.0 * len(values))) - 1, 0)]
+
+
+class StepTracer(log2l.ListenerMixin):
+    """
+    Listener that measures duration of steps, keeps tree of steps for each thread and statistics of durations.
+    """
+
+    def __init__(self, keep_spans=True):
+        """
+        :param keep_spans: keep tree of finished steps, otherwise only statistics is collected
+        """
+        self.keep_spans = keep_spans
+        self.spans = []
+        """ :type: list[Span] root steps """
+        self.__durations = {}
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__origin = clock()
+
+    def start_step(self, step_id, **options):
+        stack = self.__stack()
+        if stack and (stack[-1] is None or stack[-1].suppress_children):
+            # step inside action, it is the part of the action
+            stack.append(None)
+            return
+        span = Span(step_id, options)
+        if stack:
+            stack[-1].children.append(span)
+        stack.append(span)
+
+    def end_step(self, step_id, **options):
+        stack = self.__stack()
+        if not stack:
+            return
+        span = stack.pop()
+        if span is None:
+            return
+        span.end = clock()
+        self_duration = span.self_duration
+        with self.__lock:
+            durations = self.__durations.setdefault((span.element_name, span.step_name), ([], []))
+            durations[0].append(span.duration)
+            durations[1].append(self_duration)
+            if not stack and self.keep_spans:
+                self.spans.append(span)
+
+    def exception(self, step_id, err, **options):
+        stack = self.__stack()
+        if stack and stack[-1] is not None:
+            stack[-1].error = "{}: {}".format(err[0].__name__, err[1])
+
+    def statistics(self):
+        """
+        :return: statistics of durations in seconds for each pair of element name and step name,
+                sorted by total time descending
+        :rtype: list[dict]
+        """
+        with self.__lock:
+            items = [(k, list(d), list(s)) for k, (d, s) in self.__durations.items()]
+        result = []
+        for (element_name, step_name), durations, self_durations in items:
+            durations.sort()
+            result.append({
+                "element_name": element_name,
+                "step_name": step_name,
+                "count": len(durations),
+                "total": sum(durations),
+                "self": sum(self_durations),
+                "p50": percentile(durations, 50),
+                "p95": percentile(durations, 95),
+                "p99": percentile(durations, 99),
+                "max": durations[-1],
+            })
+        result.sort(key=lambda r: r["total"], reverse=True)
+        return result
+
+    def reset(self):
+        with self.__lock:
+            self.spans = []
+            self.__durations = {}
+            self.__origin = clock()
+
+    def save_json(self, path):
+        """
+        Save statistics and tree of steps (if kept) to json file.
+        """
+        with self.__lock:
+            spans = list(self.spans)
+        with open(path, "w") as f:
+            json.dump({"statistics": self.statistics(), "steps": [s.to_dict() for s in spans]}, f, indent=1)
+
+    def save_chrome_trace(self, path):
+        """
+        Save tree of steps in Chrome trace event format.
+        """
+        with self.__lock:
+            spans = list(self.spans)
+        events = []
+        pid = os.getpid()
+        threads = {}
+
+        def add(span):
+            tid = threads.setdefault(span.thread, len(threads) + 1)
+            events.append({
+                "name": span.name,
+                "cat": span.element_name or "step",
+                "ph": "X",
+                "ts": (span.start - self.__origin) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+                "args": {"element_name": span.element_name, "step_name": span.step_name, "error": span.error},
+            })
+            for c in span.children:
+                add(c)
+
+        for s in spans:
+            add(s)
+        for name, tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def __stack(self):
+        stack = getattr(self.__local, "stack", None)
+        if stack is None:
+            stack = self.__local.stack = []
+        return stack
@@ -0,0 +1,183 @@
+"""
+Command executor with persistent pooled HTTP connections to WebDriver server.
+
+Default command executor of selenium opens new connection for each command (or keeps one connection
+that can't be used by several threads with ``keep_alive``), so connection and TLS setup is paid for each command,
+which is noticeable for remote grids. ``PooledConnection`` keeps up to ``pool_size`` connections open,
+each command takes an idle connection (or opens a new one) and returns it after the response is read.
+
+The transport is selected by ``transport`` argument of ``webdrivers.get_driver``:
+
+    driver = get_driver("remote", {"command_executor": "https://grid:4444/wd/hub",
+                                   "desired_capabilities": capabilities,
+                                   "transport": {"pool_size": 8, "timeout": 60,
+                                                 "command_timeouts": {Command.GET: 120}}})
+
+or set for an existing driver: ``use_pooled_connection(driver, pool_size=8)``.
+Responses are requested compressed by gzip (if the server supports it), that saves time on big script results.
+"""
+import base64
+import gzip
+import io
+import socket
+import threading
+
+import six
+from selenium.webdriver.remote import utils
+from selenium.webdriver.remote.errorhandler import ErrorCode
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+from six.moves import http_client, queue
+from six.moves.urllib.parse import urlparse
+
+
+class PooledConnection(RemoteConnection):
+    def __init__(self, remote_server_addr, pool_size=4, timeout=None, command_timeouts=None, compression=True,
+                 resolve_ip=True):
+        """
+        :param remote_server_addr: url of WebDriver server
+        :param pool_size: maximum number of open connections, commands of more threads wait for a free connection
+        :param timeout: timeout of a command in seconds, ``RemoteConnection.get_timeout()`` by default
+        :param command_timeouts: dict command -> timeout, overrides ``timeout`` for the commands
+        :param compression: request compressed responses
+        """
+        RemoteConnection.__init__(self, remote_server_addr, keep_alive=False, resolve_ip=resolve_ip)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.command_timeouts = dict(command_timeouts or {})
+        self.compression = compression
+        self.connections_opened = 0
+        self.requests = 0
+        self.__idle = queue.LifoQueue()
+        self.__free = threading.BoundedSemaphore(pool_size)
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        url = urlparse(self._url)
+        self.__connection_class = http_client.HTTPSConnection if url.scheme == "https" else http_client.HTTPConnection
+        self.__address = (url.hostname, url.port)
+
+    def execute(self, command, params):
+        self.__local.command = command
+        try:
+            return RemoteConnection.execute(self, command, params)
+        finally:
+            self.__local.command = None
+
+    def close(self):
+        """
+        Close idle connections, connections in use are closed when they are returned.
+        """
+        while True:
+            try:
+                self.__idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _request(self, method, url, body=None):
+        parsed_url = urlparse(url)
+        headers = {"Connection": "keep-alive",
+                   "User-Agent": "Python http auth",
+                   "Content-type": "application/json;charset=\"UTF-8\"",
+                   "Accept": "application/json"}
+        if self.compression:
+            headers["Accept-Encoding"] = "gzip"
+        if parsed_url.username:
+            auth = "{}:{}".format(parsed_url.username, parsed_url.password).encode("utf-8")
+            headers["Authorization"] = "Basic " + base64.standard_b64encode(auth).decode("ascii")
+        if method not in ("POST", "PUT"):
+            body = None
+        elif isinstance(body, six.text_type):
+            body = body.encode("utf-8")
+        path = parsed_url.path + ("?" + parsed_url.query if parsed_url.query else "")
+        status, content_type, location, data = self.__send(method, path, body, headers)
+        if 300 <= status < 304:
+            return self._request("GET", location)
+        return _parse_response(status, content_type, data)
+
+    def __send(self, method, path, body, headers):
+        timeout = self.command_timeouts.get(getattr(self.__local, "command", None), self.timeout)
+        if timeout is None:
+            timeout = self.get_timeout()
+        self.__free.acquire()
+        try:
+            conn, reused = self.__connection()
+            try:
+                response = self.__round_trip(conn, timeout, method, path, body, headers)
+            except socket.timeout:
+                conn.close()
+                raise
+            except (http_client.HTTPException, socket.error):
+                conn.close()
+                if not reused:
+                    raise
+                # server has closed idle connection, the request is repeated once by new connection
+                conn = self.__open()
+                response = self.__round_trip(conn, timeout, method, path, body, headers)
+            status, content_type, location, data, will_close = response
+            if will_close:
+                conn.close()
+            else:
+                self.__idle.put(conn)
+            return status, content_type, location, data
+        finally:
+            self.__free.release()
+
+    def __connection(self):
+        try:
+            return self.__idle.get_nowait(), True
+        except queue.Empty:
+            return self.__open(), False
+
+    def __open(self):
+        with self.__lock:
+            self.connections_opened += 1
+        return self.__connection_class(*self.__address)
+
+    def __round_trip(self, conn, timeout, method, path, body, headers):
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        with self.__lock:
+            self.requests += 1
+        conn.request(method, path, body, headers)
+        resp = conn.getresponse()
+        try:
+            data = resp.read()
+        except Exception:
+            conn.close()
+            raise
+        if resp.getheader("Content-Encoding", "") == "gzip":
+            data = gzip.GzipFile(fileobj=io.BytesIO(data)).read()
+        return resp.status, resp.getheader("Content-Type"), resp.getheader("location"), data, resp.will_close
+
+
+def _parse_response(status, content_type, data):
+    # the same handling of the response as in ``RemoteConnection._request``
+    body = data.decode("utf-8").replace("\x00", "").strip()
+    if 399 < status <= 500:
+        return {"status": status, "value": body}
+    if any(x.startswith("image/png") for x in (content_type or "").split(";")):
+        return {"status": 0, "value": body}
+    try:
+        result = utils.load_json(body)
+    except ValueError:
+        return {"status": ErrorCode.SUCCESS if 199 < status < 300 else ErrorCode.UNKNOWN_ERROR, "value": body}
+    assert type(result) is dict, "Invalid server response body: {}".format(body)
+    result.setdefault("value", None)
+    return result
+
+
+def use_pooled_connection(driver, **options):
+    """
+    Replace command executor of the driver with ``PooledConnection`` to the same server,
+    commands known by the previous executor are kept.
+
+    :param options: parameters of ``PooledConnection``
+    :rtype: PooledConnection
+    """
+    old = driver.command_executor
+    if isinstance(old, PooledConnection):
+        return old
+    executor = PooledConnection(old._url, resolve_ip=False, **options)
+    executor._commands = dict(old._commands)
+    driver.command_executor = executor
+    return executor
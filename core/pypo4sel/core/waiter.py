@@ -1,8 +1,184 @@
+import itertools
+import random
 import time
 
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
 import common
+import counters
+import scripts
+
+
+class FixedPoll(object):
+    """
+    Poll with constant delay, ``common.WAIT_ELEMENT_POLL_FREQUENCY`` by default.
+    """
+
+    def __init__(self, frequency=None):
+        self.frequency = frequency
+
+    def delays(self):
+        while True:
+            yield common.WAIT_ELEMENT_POLL_FREQUENCY if self.frequency is None else self.frequency
+
+
+class BackoffPoll(object):
+    """
+    Poll fast at first and then exponentially increase delay up to ``max_delay``
+    (``common.WAIT_ELEMENT_POLL_FREQUENCY`` by default).
+    Each delay except the first one is randomly changed by ``jitter`` part of it,
+    so parallel waiters don't poll at the same moments.
+
+    Example:
+        BackoffPoll(first=0.01, initial=0.05, factor=2)  # 0.01, 0.05, 0.1, 0.2, 0.4, 0.5, 0.5 ...
+    """
+
+    def __init__(self, first=0.01, initial=0.05, factor=2.0, max_delay=None, jitter=0.1):
+        self.first = first
+        self.initial = initial
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delays(self):
+        yield self.first
+        delay = self.initial
+        while True:
+            max_delay = common.WAIT_ELEMENT_POLL_FREQUENCY if self.max_delay is None else self.max_delay
+            delay = min(delay, max_delay)
+            yield delay * (1 + random.uniform(-self.jitter, self.jitter))
+            delay *= self.factor
+
+
+poll_strategy = BackoffPoll()
+""" default poll strategy for all waiters, including implicit waiting of elements
+:type: FixedPoll|BackoffPoll """
+
+
+class StaleRecovery(object):
+    """
+    Recovery of an element after ``StaleElementReferenceException``:
+    the element is found again right away, sleeping is done only if it is not found
+    (up to ``tries`` times, for elements without own timeout) or if it gets stale again during the same command.
+    Delays are defined by ``poll`` strategy (``waiter.poll_strategy`` by default).
+    """
+
+    def __init__(self, poll=None, tries=3):
+        self.poll = poll
+        self.tries = tries
+
+    def recover(self, element, attempt=0):
+        """
+        :param attempt: number of previous recoveries during the same command
+        """
+        delays = None
+        if attempt:
+            delays = self.__delays(attempt - 1)
+            _sleep(element, next(delays))
+        tries = 1
+        while True:
+            try:
+                element.reload()
+                return
+            except NoSuchElementException:
+                # element with timeout has already waited in reload
+                if tries >= self.tries or element.wait_timeout:
+                    raise
+            if delays is None:
+                delays = self.__delays(0)
+            _sleep(element, next(delays))
+            tries += 1
+
+    def __delays(self, skip):
+        return itertools.islice((self.poll or poll_strategy).delays(), skip, None)
+
+
+class DelayedRecovery(object):
+    """
+    Sleep ``delay`` (``common.WAIT_ELEMENT_POLL_FREQUENCY`` by default) before finding stale element again,
+    it may be useful for pages that replace elements slowly, so the element is found stale again without the delay.
+    """
+
+    def __init__(self, delay=None):
+        self.delay = delay
+
+    def recover(self, element, attempt=0):
+        _sleep(element, common.WAIT_ELEMENT_POLL_FREQUENCY if self.delay is None else self.delay)
+        element.reload()
+
+
+stale_recovery = StaleRecovery()
+""" default recovery of stale elements, an element may have own ``stale_recovery``
+:type: StaleRecovery|DelayedRecovery """
+
+
+def recover_stale(element, attempt=0):
+    """
+    Find stale ``element`` again using its ``stale_recovery`` or default ``waiter.stale_recovery``.
+    """
+    session_counters = counters.of(getattr(element, "parent", None))
+    if session_counters is not None:
+        session_counters.stale_retry()
+    (getattr(element, "stale_recovery", None) or stale_recovery).recover(element, attempt)
+
+
+def _sleep(element, delay):
+    time.sleep(delay)
+    session_counters = counters.of(getattr(element, "parent", None))
+    if session_counters is not None:
+        session_counters.sleep(delay)
+
+
+class BrowserWait(object):
+    """
+    Wait engine that waits for a page element inside the browser with one ``execute_async_script`` call,
+    the browser reacts on DOM changes by MutationObserver instead of polling from the client.
+
+    Script timeout of the driver is increased, if it is shorter than the waiting.
+    Visibility is checked by simplified script, so in corner cases it may differ from result of ``is_displayed``.
+
+    Example:
+        waiter.wait_engine = BrowserWait()
+        wait_displayed(page.element, 10)  # one request to webdriver
+    """
+
+    def __init__(self, script_timeout_reserve=1):
+        self.script_timeout_reserve = script_timeout_reserve
+
+    @staticmethod
+    def supports(element):
+        # list items don't have own selector, they are found by the list
+        return isinstance(element, common.elements.PageElement) and element._owner is not None \
+            and not hasattr(element, "_container")
+
+    def present(self, element, timeout):
+        """
+        :return: found web element or None
+        """
+        return self.__wait(element, "present", timeout)[1]
+
+    def displayed(self, element, timeout):
+        return self.__wait(element, "displayed", timeout)[0]
+
+    def hidden(self, element, timeout):
+        return self.__wait(element, "hidden", timeout)[0]
+
+    def __wait(self, element, mode, timeout):
+        driver = element.parent
+        script_timeout = getattr(driver, "script_wait_timeout", None)
+        if script_timeout is not None and script_timeout < timeout + self.script_timeout_reserve:
+            driver.set_script_timeout(timeout + self.script_timeout_reserve)
+        done, we = common.execute_async_script(element._owner, scripts.WAIT, list(element._locator),
+                                               mode, int(timeout * 1000))
+        if we is not None:
+            element._set_found(we)
+        return done, we
+
+
+wait_engine = None
+""" engine used by ``wait_displayed``, ``wait_not_displayed`` and implicit waiting of page elements
+instead of polling from the client, e.g. ``BrowserWait()``
+:type: BrowserWait """
 
 
 class Waiter(object):
@@ -13,27 +189,47 @@ class Waiter(object):
     Return result of last ``method`` call or rise ``TimeoutException(fail_on_timeout)``
     if fail_on_timeout is not None and time expired
 
+    Delays between calls are defined by ``poll`` strategy (``waiter.poll_strategy`` by default),
+    a delay is never longer than time left to timeout, so the last call is done right at the timeout.
+
+    Time spent between calls is added to ``counters`` if they are given.
+
     Example:
         print Waiter(lambda x: x<0).start(lambda: 4, 0)  # immediately print 4
 
         Waiter(lambda x: x<0)(lambda: 4, 2, "fail")  # after 2 second waiting raise TimeoutException
 
+        Waiter(lambda x: x<0, FixedPoll(1))(lambda: 4, 2)  # call lambda 3 times
+
     """
 
-    def __init__(self, condition):
+    def __init__(self, condition, poll=None, counters=None):
+        """
+        :type counters: counters.CommandCounters
+        """
         self.__condition = condition
+        self.__poll = poll
+        self.__counters = counters
 
     def start(self, method, timeout, fail_on_timeout=None, **kwargs):
         end_time = time.time() + timeout
         value = method(**kwargs)
         check = self.__condition(value)
-        while time.time() < end_time and not check:
-            time.sleep(common.WAIT_ELEMENT_POLL_FREQUENCY)
+        delays = None
+        while not check:
+            left = end_time - time.time()
+            if left <= 0:
+                break
+            if delays is None:
+                delays = (self.__poll or poll_strategy).delays()
+            delay = min(next(delays), left)
+            time.sleep(delay)
+            if self.__counters is not None:
+                self.__counters.sleep(delay)
             value = method(**kwargs)
             check = self.__condition(value)
-        else:
-            if not check and fail_on_timeout is not None:
-                raise TimeoutException(fail_on_timeout)
+        if not check and fail_on_timeout is not None:
+            raise TimeoutException(fail_on_timeout)
         return value
 
     def __call__(self, method, timeout, fail_on_timeout=None, **kwargs):
@@ -80,7 +276,11 @@ def wait_displayed(element, timeout=None, fail_on_timeout=None):
     :param fail_on_timeout:
     :return:
     """
-    return wait(lambda: element.is_displayed(), timeout or element.wait_timeout, fail_on_timeout)
+    timeout = timeout or element.wait_timeout
+    if wait_engine is not None and wait_engine.supports(element):
+        return _check_timeout(wait_engine.displayed(element, timeout), fail_on_timeout)
+    session_counters = counters.of(getattr(element, "parent", None))
+    return Waiter(bool, counters=session_counters).start(lambda: element.is_displayed(), timeout, fail_on_timeout)
 
 
 def wait_not_displayed(element, timeout=None, fail_on_timeout=None):
@@ -93,21 +293,28 @@ def wait_not_displayed(element, timeout=None, fail_on_timeout=None):
     :param fail_on_timeout:
     :return:
     """
-    return wait(lambda: not element.is_displayed(), timeout or element.wait_timeout, fail_on_timeout)
+    timeout = timeout or element.wait_timeout
+    if wait_engine is not None and wait_engine.supports(element):
+        return _check_timeout(wait_engine.hidden(element, timeout), fail_on_timeout)
+    session_counters = counters.of(getattr(element, "parent", None))
+    return Waiter(bool, counters=session_counters).start(lambda: not element.is_displayed(), timeout, fail_on_timeout)
+
+
+def _check_timeout(result, fail_on_timeout):
+    if not result and fail_on_timeout is not None:
+        raise TimeoutException(fail_on_timeout)
+    return result
 
 
 # noinspection PyPep8Naming
 class skip_implicit_wait(object):
+    # timeouts of the elements are not changed, so the elements may be used with waiting by other threads
     def __init__(self, element, *elements):
-        els = [element]
-        els.extend(elements)
-        self._timeouts = [(e, e.wait_timeout) for e in els]
+        self._context = common.skip_wait(element, *elements)
 
     def __enter__(self):
-        for e, _ in self._timeouts:
-            e.wait_timeout = 0
+        self._context.__enter__()
 
     # noinspection PyUnusedLocal
     def __exit__(self, exc_type, exc_val, exc_tb):
-        for e, t in self._timeouts:
-            e.wait_timeout = t
+        self._context.__exit__(exc_type, exc_val, exc_tb)
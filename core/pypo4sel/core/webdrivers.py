@@ -1,23 +1,49 @@
+import contextlib
 import hashlib
 import inspect
+import threading
 
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.command import Command
 
 import common
+import counters
 import log2l
+import scripts
+import transport
+
+# after these commands the driver works with another document, so found elements should be searched again
+NAVIGATION_COMMANDS = frozenset([Command.GET, Command.GO_BACK, Command.GO_FORWARD, Command.REFRESH])
+SWITCH_COMMANDS = frozenset([Command.SWITCH_TO_FRAME, Command.SWITCH_TO_PARENT_FRAME, Command.SWITCH_TO_WINDOW,
+                             Command.CLOSE])
 
 
 # TODO move step text to resources
 class WebDriverBase(common.FindOverride):
-    implicitly_wait_timeout = 0
+    implicitly_wait_timeout = None
     script_wait_timeout = 0
     page_load_timeout = 0
+    epoch = 0
+    """
+    Number of navigations and switches of frames and windows by the driver,
+    ids of page elements found in previous epoch are not used, the elements are searched again.
+    """
+    # ids of frames the driver was switched to by ``common.enter_frames``, None if a frame was switched by user
+    _frame_scope = ()
+    _switching_scope = False
+    # nested page elements are searched by one XPath compiled from their locators, see ``xpath`` module
+    compile_locators = True
 
     def implicitly_wait(self, time_to_wait):
-        tm = float(time_to_wait)
-        old = common.WAIT_ELEMENT_TIMEOUT
-        common.WAIT_ELEMENT_TIMEOUT = tm
-        self.implicitly_wait_timeout = tm
+        """
+        Set default timeout for page elements used with the driver,
+        until it is set ``common.WAIT_ELEMENT_TIMEOUT`` is used.
+        Timeout of one driver doesn't affect elements of other drivers.
+        :return: previous timeout
+        """
+        old = common.WAIT_ELEMENT_TIMEOUT if self.implicitly_wait_timeout is None else self.implicitly_wait_timeout
+        self.implicitly_wait_timeout = float(time_to_wait)
         return old
 
     def set_script_timeout(self, time_to_wait):
@@ -38,6 +64,46 @@ class WebDriverBase(common.FindOverride):
     def driver(self):
         return self
 
+    @property
+    def counters(self):
+        """
+        Counters of commands sent by the driver, stale element retries and waiting of its elements.
+        :rtype: counters.CommandCounters
+        """
+        result = self.__dict__.get("_counters")
+        if result is None:
+            result = self._counters = counters.CommandCounters()
+        return result
+
+    def snapshot(self):
+        """
+        Take snapshot of the current page with one request, see ``dom`` module.
+        :rtype: dom.DomSnapshot
+        """
+        html, title, url = common.execute_script(self, scripts.SNAPSHOT)
+        return dom.DomSnapshot(html, url, title)
+
+    def execute(self, driver_command, params=None):
+        self._on_command(driver_command)
+        start = counters.clock()
+        try:
+            # noinspection PyUnresolvedReferences
+            return super(WebDriverBase, self).execute(driver_command, params)
+        finally:
+            self.counters.command(driver_command, counters.clock() - start)
+
+    def _on_command(self, driver_command):
+        if self._switching_scope:
+            return
+        if driver_command in NAVIGATION_COMMANDS:
+            self.epoch += 1
+            # navigation returns the driver to the top document
+            self._frame_scope = ()
+        elif driver_command in SWITCH_COMMANDS:
+            self.epoch += 1
+            if self._frame_scope:
+                self._frame_scope = None
+
     @log2l.step
     def get(self, url):
         # noinspection PyUnresolvedReferences
@@ -122,7 +188,9 @@ BROWSER_MAPPING = {"remote": RemoteDriver,
 def get_driver(browser='firefox', args=None):
     """
     :param browser:
-    :param args:
+    :param args: arguments of the driver class, unknown ones are ignored,
+            'transport' argument is True or dict of parameters of ``transport.PooledConnection``
+            to send commands by persistent pooled connections
     :rtype: RemoteDriver
     :return:
     """
@@ -136,4 +204,156 @@ def get_driver(browser='firefox', args=None):
         for arg in expected_arguments:
             if arg in args:
                 safe_args[arg] = args[arg]
-    return driver_cls(**safe_args)
+    driver = driver_cls(**safe_args)
+    transport_options = (args or {}).get("transport")
+    if transport_options:
+        transport.use_pooled_connection(driver, **(transport_options if isinstance(transport_options, dict) else {}))
+    return driver
+
+
+class DriverPool(object):
+    """
+    Keep started drivers warm and lease them again instead of starting new browser for each test.
+    Drivers are kept separately for each browser and arguments of ``get_driver``.
+
+    Before a driver is returned to the pool, cookies, local and session storage of the current page are cleared,
+    implicit timeout is reset and 'about:blank' is opened.
+    A driver is quit instead of returning to the pool if it was used ``max_uses`` times,
+    was released as failed or if the reset failed.
+    Before a lease, idle driver is checked to be alive, dead one is quit and replaced.
+
+    Example:
+        pool = DriverPool(max_uses=20)
+        with pool.lease('chrome') as driver:
+            MyPage(driver).element.click()
+        pool.close()
+
+        # conftest.py
+        driver = pool.fixture('chrome')
+    """
+
+    def __init__(self, max_uses=50, factory=None):
+        """
+        :param max_uses: how many times a driver may be leased before it is quit
+        :param factory: function to start a driver with (browser, args) parameters, ``get_driver`` by default
+        """
+        self.max_uses = max_uses
+        self._factory = factory or get_driver
+        self._lock = threading.Lock()
+        self._idle = {}
+        """ :type: dict[tuple, list[(RemoteDriver, int)]] """
+        self._leased = {}
+
+    def acquire(self, browser='firefox', args=None):
+        """
+        :rtype: RemoteDriver
+        :return: idle alive driver for the browser and args or a new one
+        """
+        key = self._key(browser, args)
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                driver, uses = idle.pop() if idle else (None, 0)
+            if driver is None:
+                driver = self._factory(browser, args)
+                break
+            if self._is_alive(driver):
+                break
+            self._quit(driver)
+        with self._lock:
+            self._leased[id(driver)] = (key, uses + 1)
+        return driver
+
+    def release(self, driver, failed=False):
+        """
+        Return the driver to the pool or quit it.
+        :param failed: the driver shouldn't be used anymore
+        """
+        with self._lock:
+            key, uses = self._leased.pop(id(driver))
+        if failed or uses >= self.max_uses or not self._reset(driver):
+            self._quit(driver)
+            return
+        with self._lock:
+            self._idle.setdefault(key, []).append((driver, uses))
+
+    @contextlib.contextmanager
+    def lease(self, browser='firefox', args=None):
+        """
+        Context with leased driver, the driver is released as failed if WebDriverException occurred.
+        """
+        driver = self.acquire(browser, args)
+        failed = False
+        try:
+            yield driver
+        except WebDriverException:
+            failed = True
+            raise
+        finally:
+            self.release(driver, failed)
+
+    def fixture(self, browser='firefox', args=None, scope="function", name=None):
+        """
+        Create pytest fixture with leased driver.
+        Assign result to module level variable of conftest.py or test module to use it.
+        """
+        import pytest
+
+        @pytest.fixture(scope=scope, name=name)
+        def driver_fixture():
+            with self.lease(browser, args) as driver:
+                yield driver
+
+        return driver_fixture
+
+    def close(self):
+        """
+        Quit all idle drivers.
+        """
+        with self._lock:
+            drivers = [d for idle in self._idle.values() for d, _ in idle]
+            self._idle.clear()
+        for d in drivers:
+            self._quit(d)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _key(browser, args):
+        return browser, tuple(sorted((k, repr(v)) for k, v in (args or {}).items()))
+
+    @staticmethod
+    def _is_alive(driver):
+        try:
+            return driver.session_id is not None and driver.current_url is not None
+        except Exception:
+            # connection errors are raised as is, if browser process is dead
+            return False
+
+    @staticmethod
+    def _reset(driver):
+        try:
+            driver.delete_all_cookies()
+            driver.execute_script("window.localStorage && localStorage.clear();"
+                                  "window.sessionStorage && sessionStorage.clear();")
+            driver.get("about:blank")
+        except WebDriverException:
+            return False
+        if isinstance(driver, WebDriverBase):
+            driver.implicitly_wait_timeout = None
+            driver.counters.reset()
+        return True
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+import dom
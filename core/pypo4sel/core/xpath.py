@@ -0,0 +1,215 @@
+"""
+Compilation of locators of nested page elements into one XPath.
+
+Page element inside a page block is searched inside the block, so a leaf of not found blocks
+is found by a chain of ``find_element`` calls, one per level. If locators of all levels can be expressed
+by XPath, the chain is compiled into one XPath with the same result (the first match on each level):
+
+    ("id", "form"), ("css selector", "div.row > input")
+    -> (descendant::*[@id="form"])[1]/descendant::*[self::input and contains(...) and parent::*[self::div ...]]
+
+Locators by id, name, class name, tag name, relative XPath (starting with './' or './/')
+and CSS selectors of the subset supported by ``dom`` module (without ``checked``, ``disabled``
+and ``enabled`` pseudo classes) are compiled, other chains are searched level by level.
+Compiled XPaths are cached in ``compiled_cache``.
+"""
+from __future__ import unicode_literals
+
+import re
+
+from selenium.webdriver.common.by import By
+
+# chain of locators -> compiled XPath or False, chains are declared by page object classes, so the cache is small
+compiled_cache = {}
+
+_is_tag = re.compile(r"^[a-zA-Z][\w-]*$").match
+
+
+def compile_chain(element):
+    """
+    :return: owner to search the element from and locator, the locator combines locators of the element
+            and of its not found owners if the driver supports it and all of them can be compiled
+    :rtype: (object, tuple[str, str])
+    """
+    owner = element._owner
+    if getattr(element._parent, "compile_locators", False) is not True or not _is_compilable_owner(owner):
+        return owner, element._locator
+    locators = [element._locator]
+    while _is_compilable_owner(owner):
+        locators.append(owner._locator)
+        owner = owner._owner
+    locators.reverse()
+    key = tuple(locators)
+    compiled = compiled_cache.get(key)
+    if compiled is None:
+        compiled = compiled_cache[key] = combine(locators) or False
+    if compiled is False:
+        return element._owner, element._locator
+    return owner, (By.XPATH, compiled)
+
+
+def _is_compilable_owner(owner):
+    # page block that isn't found and can be found together with its children,
+    # children of frames, shadow roots and list items are searched from them
+    return (isinstance(owner, elements.PageElement) and
+            not isinstance(owner, (elements.Frame, elements.ShadowRoot, elements._ListItem)) and
+            not elements._is_found(owner))
+
+
+def combine(locators):
+    """
+    :param locators: locators from the top one, each next one is searched inside the first match of previous one
+    :return: XPath relative to the context of the top locator or None if some of locators can't be compiled
+    """
+    result = None
+    for by, value in locators:
+        step = to_xpath(by, value)
+        if step is None:
+            return None
+        result = step if result is None else "({})[1]/{}".format(result, step)
+    return result
+
+
+def to_xpath(by, value):
+    """
+    :return: relative XPath with the same matches in the context element as the locator or None
+    """
+    if by == By.ID:
+        return "descendant::*[@id={}]".format(literal(value))
+    if by == By.NAME:
+        return "descendant::*[@name={}]".format(literal(value))
+    if by == By.CLASS_NAME:
+        return "descendant::*[{}]".format(_has_word("@class", value))
+    if by == By.TAG_NAME:
+        return "descendant::{}".format(value.lower()) if _is_tag(value) else None
+    if by == By.XPATH:
+        if "|" in value:
+            return None
+        if value.startswith(".//"):
+            return "descendant-or-self::node()/" + value[3:]
+        if value.startswith("./") and len(value) > 2:
+            return value[2:]
+        return None
+    if by == By.CSS_SELECTOR:
+        return css_to_xpath(value)
+    return None
+
+
+def css_to_xpath(selector):
+    """
+    :return: relative XPath matching descendants of the context element as ``querySelectorAll`` does or None
+    """
+    groups, complex_selector, conditions, combinator = [], [], None, None
+    pos, selector = 0, selector.strip()
+    while pos < len(selector):
+        m = dom._CSS_TOKEN.match(selector, pos)
+        if m is None or m.end() == pos:
+            return None
+        pos = m.end()
+        if m.group("combinator") or m.group("space"):
+            if conditions is None:
+                return None
+            complex_selector.append((combinator, conditions))
+            conditions = None
+            combinator = m.group("combinator") or " "
+            if combinator == ",":
+                groups.append(complex_selector)
+                complex_selector, combinator = [], None
+            continue
+        condition = _condition(m)
+        if condition is None:
+            return None
+        conditions = (conditions or []) + ([condition] if condition else [])
+    if conditions is None:
+        return None
+    complex_selector.append((combinator, conditions))
+    groups.append(complex_selector)
+    predicates = [_predicate(c) for c in groups]
+    if len(predicates) == 1:
+        return "descendant::*" + ("[{}]".format(predicates[0]) if predicates[0] else "")
+    return "descendant::*[{}]".format(" or ".join("({})".format(p or "true()") for p in predicates))
+
+
+_AXES = {
+    " ": "ancestor::*",
+    ">": "parent::*",
+    "+": "preceding-sibling::*[1]",
+    "~": "preceding-sibling::*",
+}
+
+
+def _predicate(complex_selector):
+    # the last compound selector is the element itself, previous ones are checked by axes from it
+    inner = None
+    for i, (_, conditions) in enumerate(complex_selector[:-1]):
+        parts = conditions + ([inner] if inner else [])
+        inner = _AXES[complex_selector[i + 1][0]] + ("[{}]".format(" and ".join(parts)) if parts else "")
+    parts = complex_selector[-1][1] + ([inner] if inner else [])
+    return " and ".join(parts)
+
+
+def _condition(m):
+    # empty string is a condition that is always true, None is a condition that can't be compiled
+    if m.group("tag"):
+        tag = m.group("tag").lower()
+        return "" if tag == "*" else "self::" + tag
+    if m.group("id"):
+        return "@id={}".format(literal(m.group("id")))
+    if m.group("cls"):
+        return _has_word("@class", m.group("cls"))
+    if m.group("attr"):
+        if ":" in m.group("attr"):
+            return None
+        return _attribute("@" + m.group("attr").lower(), m.group("op"),
+                          next((v for v in (m.group("dq"), m.group("sq"), m.group("uq")) if v is not None), None))
+    pseudo, arg = m.group("pseudo"), m.group("arg")
+    if pseudo == "first-child":
+        return "not(preceding-sibling::*)"
+    if pseudo == "last-child":
+        return "not(following-sibling::*)"
+    if pseudo == "only-child":
+        return "not(preceding-sibling::*) and not(following-sibling::*)"
+    if pseudo == "nth-child" and arg is not None:
+        if arg in ("odd", "even"):
+            return "count(preceding-sibling::*) mod 2 = {}".format(0 if arg == "odd" else 1)
+        if arg.isdigit() and int(arg) > 0:
+            return "count(preceding-sibling::*) = {}".format(int(arg) - 1)
+    return None
+
+
+def _attribute(name, operator, expected):
+    if operator is None:
+        return name
+    if operator == "=":
+        return "{}={}".format(name, literal(expected))
+    if operator == "|=":
+        return "({0}={1} or starts-with({0}, {2}))".format(name, literal(expected), literal(expected + "-"))
+    if not expected or operator == "~=" and len(expected.split()) != 1:
+        # such selectors don't match anything
+        return "false()"
+    if operator == "~=":
+        return _has_word(name, expected)
+    if operator == "^=":
+        return "starts-with({}, {})".format(name, literal(expected))
+    if operator == "$=":
+        return "substring({0}, string-length({0}) - {1}) = {2}".format(name, len(expected) - 1, literal(expected))
+    return "contains({}, {})".format(name, literal(expected))
+
+
+def _has_word(name, word):
+    return "contains(concat(' ', normalize-space({}), ' '), {})".format(name, literal(" " + word + " "))
+
+
+def literal(value):
+    """
+    :return: XPath string literal with the value
+    """
+    if '"' not in value:
+        return '"{}"'.format(value)
+    if "'" not in value:
+        return "'{}'".format(value)
+    return "concat({})".format(", '\"', ".join('"{}"'.format(part) for part in value.split('"')))
+
+
+import dom
+import elements
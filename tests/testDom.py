@@ -0,0 +1,138 @@
+# coding=utf-8
+import unittest
+
+from mock import Mock
+from selenium.common.exceptions import InvalidSelectorException, NoSuchElementException, WebDriverException
+
+from pypo4sel import PageElementsContainer
+from pypo4sel.core import scripts
+from pypo4sel.core.dom import DomSnapshot
+from pypo4sel.core.elements import PageElement, PageElementsList
+from pypo4sel.core.webdrivers import WebDriverBase
+
+HTML = u"""<html><head><title>Shop</title><style>p {color: red}</style></head>
+<body>
+<div id="header" class="top bar"><h1>Goods &amp; services</h1><a href="/cart">Cart <b>(2)</b></a></div>
+<ul class="items">
+    <li class="item first"><span class="name">Apple</span> <span class="price">1</span></li>
+    <li class="item"><span class="name">Pear</span> <span class="price">2</span></li>
+    <li class="item" data-snapshot-hidden="none"><span class="name">Plum</span></li>
+</ul>
+<form name="order">
+    <input name="count" value="3"><input type="checkbox" name="gift" checked>
+    <select name="color"><option value="r">Red</option><option value="g" selected>Green</option></select>
+    <textarea name="comment">Fast&#33;</textarea>
+    <input type="hidden" name="token" value="x">
+</form>
+<p style="display: none">hidden</p>
+</body></html>"""
+
+
+class Item(PageElement):
+    name = PageElement(".name")
+    price = PageElement(".price")
+
+
+class ShopPage(PageElementsContainer):
+    header = PageElement("#header")
+    title = PageElement("h1")
+    cart = PageElement("$link_text:Cart (2)")
+    items = PageElementsList(".items > li", el_class=Item)
+    count = PageElement("[name=count]")
+    gift = PageElement("[name=gift]")
+    color = PageElement("$x:.//select[@name='color']")
+    comment = PageElement("textarea")
+    token = PageElement("[name=token]")
+    missing = PageElement("#missing", timeout=10)
+
+    def __init__(self, driver):
+        self.driver = driver
+
+
+class TestDomSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = DomSnapshot(HTML, "http://shop/list")
+        self.page = ShopPage(self.snapshot)
+
+    def test_page_object(self):
+        self.assertEqual(u"Goods & services", self.page.title.text)
+        self.assertEqual(3, len(self.page.items))
+        self.assertEqual([u"Apple", u"Pear", u""], [i.name.text for i in self.page.items])
+        self.assertEqual(u"1", self.page.items[0].price.text)
+        self.assertTrue(self.page.header.has_class("bar"))
+        self.assertEqual(u"http://shop/cart", self.page.cart.get_attribute("href"))
+        self.assertEqual("Shop", self.snapshot.title)
+
+    def test_text(self):
+        self.assertEqual(u"Goods & services\nCart (2)", self.page.header.text)
+        self.assertEqual(u"Apple 1", self.page.items[0].text)
+
+    def test_form_fields(self):
+        self.assertEqual(u"3", self.page.count.get_attribute("value"))
+        self.assertTrue(self.page.gift.is_selected())
+        self.assertEqual("true", self.page.gift.get_attribute("checked"))
+        self.assertEqual(u"g", self.page.color.get_attribute("value"))
+        self.assertEqual(u"Fast!", self.page.comment.get_attribute("value"))
+        self.assertEqual("select", self.page.color.tag_name)
+
+    def test_displayed(self):
+        self.assertTrue(self.page.items[1].is_displayed())
+        self.assertFalse(self.page.items[2].is_displayed())
+        self.assertFalse(self.page.token.is_displayed())
+        self.assertFalse(self.snapshot.child_element("p").is_displayed())
+
+    def test_missing_element_is_not_waited(self):
+        self.assertFalse(self.page.missing.exists())
+        with self.assertRaises(NoSuchElementException):
+            self.page.missing.click()
+
+    def test_css(self):
+        def names(selector):
+            return [e.get_attribute("name") or e.tag_name for e in self.snapshot.find_elements(selector)]
+
+        self.assertEqual(["count", "gift", "token"], names("form input"))
+        self.assertEqual(["gift"], names("input:checked, option[value=x]"))
+        self.assertEqual(["comment"], names("select + textarea"))
+        self.assertEqual(["li"], names("li.item:nth-child(2)"))
+        self.assertEqual(["li", "li"], names("li ~ li"))
+        self.assertEqual(["span"], names("li:first-child span[class^=pr]"))
+        with self.assertRaises(InvalidSelectorException):
+            names("li:hover")
+
+    def test_xpath(self):
+        self.assertEqual(2, len(self.snapshot.find_elements("$x://li[@class='item']")))
+        self.assertEqual(u"Pear", self.page.items[1].child_element("$x:./span").text)
+        # absolute path is searched from the document
+        self.assertEqual(u"Apple", self.page.items[1].child_element("$x://span").text)
+        with self.assertRaises(InvalidSelectorException):
+            self.snapshot.find_elements("$x://li[contains(@class, 'item')]")
+
+    def test_unsupported_commands(self):
+        with self.assertRaises(WebDriverException):
+            self.page.count.send_keys("4")
+        with self.assertRaises(WebDriverException):
+            self.snapshot.execute_script("return 1")
+
+
+class Driver(WebDriverBase):
+    def __init__(self):
+        self.execute_script = Mock(return_value=[u"<div id='a'>text</div>", u"title", u"http://page"])
+
+
+class TestTakeSnapshot(unittest.TestCase):
+    def test_driver_snapshot(self):
+        driver = Driver()
+        snapshot = driver.snapshot()
+        driver.execute_script.assert_called_once_with(scripts.SNAPSHOT, None)
+        self.assertEqual(u"text", snapshot.child_element("#a").text)
+        self.assertEqual(u"title", snapshot.title)
+        self.assertEqual(u"http://page", snapshot.current_url)
+
+    def test_element_snapshot(self):
+        driver = Driver()
+        element = PageElement("#a")
+        element._parent = driver
+        element._id = "1"
+        snapshot = element.snapshot()
+        driver.execute_script.assert_called_once_with(scripts.SNAPSHOT, element)
+        self.assertEqual(u"text", snapshot.child_element("#a").text)
@@ -1,11 +1,15 @@
+import inspect
 import unittest
 
 from mock import Mock, patch
-from selenium.common.exceptions import InvalidSelectorException, NoSuchElementException
+from selenium.common.exceptions import InvalidSelectorException, NoSuchElementException, \
+    StaleElementReferenceException, ElementNotVisibleException
 from selenium.webdriver.common.by import By
 
 from pypo4sel import PageElementsContainer
-from pypo4sel.core.common import build_locator, FindOverride, BasePageElement
+from pypo4sel.core import scripts, xpath
+from pypo4sel.core.common import build_locator, FindOverride, BasePageElement, _LocatorCache
+from pypo4sel.core.counters import CommandCounters
 from pypo4sel.core.elements import WebElement, PageElement, PageElementsList
 
 
@@ -51,6 +55,26 @@ class TestBuildLocator(unittest.TestCase):
         self.assertEqual((By.CSS_SELECTOR, "sss .ddd"), build_locator("sss .ddd"))
         self.assertEqual((By.CSS_SELECTOR, "#sss ddd"), build_locator("#sss ddd"))
 
+    def test_name_and_links(self):
+        self.assertEqual((By.NAME, "user"), build_locator("@user"))
+        self.assertEqual((By.LINK_TEXT, "Sign in"), build_locator("$link_text:Sign in"))
+        self.assertEqual((By.PARTIAL_LINK_TEXT, "Sign"), build_locator("$partial_link_text:Sign"))
+
+    @patch('pypo4sel.core.common._parse_locator')
+    def test_parsed_locator_is_cached(self, parse):
+        parse.return_value = (By.ID, "cached")
+        self.assertEqual((By.ID, "cached"), build_locator("#cached_selector"))
+        self.assertEqual((By.ID, "cached"), build_locator("#cached_selector"))
+        parse.assert_called_once_with("#cached_selector")
+
+    def test_locators_cache_is_bounded(self):
+        cache = _LocatorCache(2)
+        for i in range(5):
+            cache.put(i, i)
+        self.assertIsNone(cache.get(0))
+        self.assertEqual(3, cache.get(3))
+        self.assertEqual(4, cache.get(4))
+
 
 class TestFindOverride(unittest.TestCase):
     @classmethod
@@ -114,11 +138,28 @@ class TestBasePageElement(unittest.TestCase):
         m.assert_called_once_with("by")
 
     @patch.object(BasePageElement, "_fill_owner")
-    def test_get_calls_fill_owner_anr_returns_self(self, mth):
+    def test_get_calls_fill_owner_and_returns_bound_copy(self, mth):
         sut = BasePageElement("by", 'selector')
         r = sut.__get__("owner", "cls")
         mth.assert_called_once_with("owner")
-        self.assertEqual(r, sut)
+        self.assertIsNot(r, sut)
+        self.assertIs(type(r), type(sut))
+        self.assertEqual(r._locator, sut._locator)
+
+    def test_get_keeps_bound_copy_per_owner(self):
+        c = type("Container", (object,), {'driver': 'driver'})
+        sut = BasePageElement("by", 'selector')
+        first, second = c(), c()
+        self.assertIs(sut.__get__(first), sut.__get__(first))
+        self.assertIsNot(sut.__get__(first), sut.__get__(second))
+        self.assertIs(sut, sut.__get__(None, c))
+
+    def test_wait_timeout_of_driver(self):
+        sut = BasePageElement("by", 'selector')
+        sut._fill_owner(type("Container", (object,), {'driver': Mock(implicitly_wait_timeout=3)}))
+        self.assertEqual(3, sut.wait_timeout)
+        sut.wait_timeout = 1
+        self.assertEqual(1, sut.wait_timeout)
 
     def test_fill_owner_without_driver(self):
         sut = BasePageElement("by", 'selector')
@@ -168,6 +209,25 @@ class TestPageElementContainer(unittest.TestCase):
         c = cc()
         self.assertEqual("page_element", c.page_element._name)
 
+    def test_members_are_scanned_once_per_class(self):
+        setattr(self.container_cls, "page_element", BasePageElement("s"))
+        setattr(self.container_cls, "_private", BasePageElement("p"))
+        with patch('inspect.getmro', wraps=inspect.getmro) as getmro:
+            c = self.container_cls()
+            self.container_cls()
+            self.assertEqual(["page_element"], [k for k, _ in c.all_elements()])
+            self.assertEqual("_private", self.container_cls._private._name)
+        getmro.assert_called_once_with(self.container_cls)
+
+    def test_elements_are_separated_by_owner(self):
+        setattr(self.container_cls, "page_element", PageElement("s"))
+        first, second = self.container_cls(), self.container_cls()
+        first.driver, second.driver = Mock(), Mock()
+        first.page_element._id = "1"
+        self.assertEqual("1", first.page_element._id)
+        self.assertIsNone(second.page_element._id)
+        self.assertIs(second.driver, second.page_element.parent)
+
     def test_auto_name_for_multi_base(self):
         inh = type("inh", (self.container_cls,), {})
         inh1 = type("inh1", (self.container_cls,), {})
@@ -239,6 +299,43 @@ class TestPageElement(unittest.TestCase):
         mock.return_value = False
         self.assertFalse(self.sut.is_displayed())
 
+    @patch.object(WebElement, "_execute")
+    def test_visibility_is_not_checked_again_before_interaction(self, execute):
+        execute.return_value = {"value": True}
+        self.sut._id = "1"
+        self.sut.click()
+        self.sut.clear()
+        self.assertEqual(["isElementDisplayed", "clickElement", "clearElement"],
+                         [c[0][0] for c in execute.call_args_list])
+
+    @patch.object(WebElement, "_execute")
+    def test_visibility_ttl(self, execute):
+        execute.return_value = {"value": True}
+        self.sut._id = "1"
+        self.sut.visibility_ttl = 0
+        self.sut.click()
+        self.sut.click()
+        self.assertEqual(["isElementDisplayed", "clickElement"] * 2, [c[0][0] for c in execute.call_args_list])
+
+    @patch.object(WebElement, "_execute")
+    def test_visibility_is_checked_if_element_has_been_hidden(self, execute):
+        execute.side_effect = [{"value": True}, {}, ElementNotVisibleException(), {"value": True}, {}]
+        self.sut._id = "1"
+        self.sut.click()
+        self.sut.click()
+        self.assertEqual(["isElementDisplayed", "clickElement", "clickElement", "isElementDisplayed", "clickElement"],
+                         [c[0][0] for c in execute.call_args_list])
+
+    @patch.object(PageElement, "reload")
+    @patch.object(WebElement, "_execute")
+    def test_stale_retries_are_counted(self, execute, reload):
+        execute.side_effect = [StaleElementReferenceException(), "value"]
+        self.sut._id = "1"
+        self.sut._parent = Mock(counters=CommandCounters())
+        self.assertEqual("value", self.sut._execute("getElementText"))
+        self.assertEqual(1, self.sut._parent.counters.stale_retries)
+        reload.assert_called_once_with()
+
 
 # noinspection PyUnresolvedReferences
 class TestElementList(unittest.TestCase):
@@ -315,3 +412,246 @@ class TestElementList(unittest.TestCase):
         fe.return_value = []
         self.sut.reload()
         self.assertFalse(self.sut.is_displayed())
+
+    @patch.object(WebElement, "find_elements")
+    def test_fetch_reads_list_with_one_script_call(self, fes):
+        driver = Mock()
+        driver.execute_script.return_value = [[type('el', (object,), dict(id=i, parent='parent')), 't%i' % i,
+                                               i > 0, ['h%i' % i]] for i in range(3)]
+        self.sut._owner = driver
+        records = self.sut.fetch(attrs=['href'], displayed=True)
+        self.assertEqual(1, driver.execute_script.call_count)
+        self.assertEqual(['t0', 't1', 't2'], [r.text for r in records])
+        self.assertEqual([False, True, True], [r.displayed for r in records])
+        self.assertEqual({'href': 'h2'}, records[2].attributes)
+        self.assertEqual(2, self.sut[2].id)
+        self.assertFalse(fes.called)
+
+
+    @patch.object(WebElement, "find_elements")
+    def test_snapshot_searches_list_once(self, fe):
+        fe.return_value = [type('el', (object,), dict(id=i)) for i in range(3)]
+        with self.sut.snapshot() as rows:
+            for i in range(len(rows)):
+                self.assertEqual(i, rows[i].id)
+            self.assertEqual([0, 1, 2], [e.id for e in rows])
+            with self.assertRaises(IndexError):
+                rows[3]
+        self.assertEqual(1, fe.call_count)
+        len(self.sut)
+        self.assertEqual(2, fe.call_count)
+
+    @patch.object(WebElement, "find_elements")
+    def test_cached_length_invalidate(self, fe):
+        fe.return_value = [type('el', (object,), dict(id=i)) for i in range(3)]
+        sut = PageElementsList("selector", cached_length=True)
+        sut._owner = self.sut._owner
+        self.assertEqual(3, len(sut))
+        fe.return_value = fe.return_value[:2]
+        self.assertEqual(3, len(sut))
+        sut.invalidate()
+        self.assertEqual(2, len(sut))
+        self.assertEqual(2, fe.call_count)
+
+    def test_item_class_is_created_once_per_element_class(self):
+        class Row(PageElement):
+            pass
+
+        self.assertIs(PageElementsList("tr", Row)._el_class, PageElementsList("li", Row)._el_class)
+        self.assertIsNot(PageElementsList("tr", Row)._el_class, PageElementsList("tr")._el_class)
+        self.assertTrue(issubclass(PageElementsList("tr", Row)._el_class, Row))
+
+    @patch.object(WebElement, "find_elements")
+    def test_items_keep_state_in_slots(self, fe):
+        fe.return_value = [type('el', (object,), dict(id=i)) for i in range(2)]
+        self.sut.reload()
+        self.assertEqual({}, self.sut[1].__dict__)
+        self.assertEqual("(tag name:selector)[1]", self.sut[1].name)
+        self.assertEqual(("tag name", "no_selector"), self.sut[1]._locator)
+
+    @patch.object(WebElement, "find_elements")
+    def test_items_with_custom_init(self, fe):
+        class Row(PageElement):
+            def __init__(self, selector):
+                super(Row, self).__init__(selector)
+                self.custom = selector
+
+        fe.return_value = [type('el', (object,), dict(id=i)) for i in range(2)]
+        sut = PageElementsList("tr", Row)
+        sut._owner = self.sut._owner
+        self.assertEqual("no_selector", sut[0].custom)
+        self.assertEqual(1, sut[1].id)
+
+# noinspection PyUnresolvedReferences
+class TestPrefetch(unittest.TestCase):
+    def setUp(self):
+        class Block(PageElement):
+            field = PageElement("#field")
+
+        class Page(PageElementsContainer):
+            first = PageElement("#first")
+            block = Block(".block")
+            items = PageElementsList("li")
+
+            def __init__(self, driver):
+                self.driver = driver
+
+        self.dom = {'block': 'b', 'field': 'f', 'first': '1', 'li': ['l0', 'l1']}
+        self.driver = Mock()
+        self.driver.execute_script.side_effect = self._execute_script
+        self.page = Page(self.driver)
+
+    def _execute_script(self, script, root, locators):
+        def we(i):
+            return type('el', (object,), dict(id=i, parent='parent'))
+
+        found = []
+        for by, value, many, parent in locators:
+            ids = self.dom.get(value) if parent < 0 or found[parent] is not None else None
+            found.append(None if ids is None else [we(i) for i in ids] if many else we(ids))
+        return found
+
+    def test_prefetch_uses_one_script_call(self):
+        self.assertTrue(self.page.prefetch())
+        self.assertEqual(1, self.driver.execute_script.call_count)
+        locators = self.driver.execute_script.call_args[0][2]
+        self.assertEqual(4, len(locators))
+        self.assertIn(['id', 'first', False, -1], locators)
+        self.assertIn(['tag name', 'li', True, -1], locators)
+        block = locators.index(['class name', 'block', False, -1])
+        self.assertIn(['id', 'field', False, block], locators)
+
+    @patch.object(WebElement, "find_element")
+    @patch.object(WebElement, "find_elements")
+    def test_prefetched_elements_are_not_reloaded(self, fes, fe):
+        self.page.prefetch()
+        self.assertEqual('1', self.page.first.id)
+        self.assertEqual('b', self.page.block.id)
+        self.assertEqual('f', self.page.block.field.id)
+        self.assertEqual('l1', self.page.items[1].id)
+        self.assertFalse(fe.called)
+        self.assertFalse(fes.called)
+
+    def test_not_found_elements_stay_not_loaded(self):
+        del self.dom['block']
+        self.assertFalse(self.page.prefetch())
+        self.assertIsNone(self.page.block._id)
+        self.assertEqual('1', self.page.first.id)
+
+
+class TestFill(unittest.TestCase):
+    def setUp(self):
+        class Page(PageElementsContainer):
+            login = PageElement("#login")
+            remember = PageElement("#remember")
+            photo = PageElement("#photo")
+            items = PageElementsList("li")
+
+            def __init__(self, driver):
+                self.driver = driver
+
+        self.driver = Mock()
+        self.page = Page(self.driver)
+
+    @staticmethod
+    def we(i):
+        return type('el', (object,), dict(id=i, parent='parent'))
+
+    def test_fill_with_one_script_call(self):
+        self.driver.execute_script.return_value = [[self.we('l'), True], [self.we('r'), True]]
+        self.page.fill([("login", "user"), ("remember", True)])
+        self.driver.execute_script.assert_called_once_with(
+            scripts.FILL, None, [['id', 'login'], ['id', 'remember']], ["user", True], True)
+        self.assertEqual('l', self.page.login.id)
+        self.assertEqual('r', self.page.remember.id)
+
+    @patch.object(WebElement, "_execute")
+    def test_not_filled_fields_are_filled_by_webdriver(self, execute):
+        execute.return_value = {"value": True}
+        self.driver.execute_script.return_value = [[self.we('l'), True], [self.we('p'), False]]
+        with patch.object(PageElement, "send_keys") as send_keys:
+            self.page.fill([("login", "user"), ("photo", "/tmp/photo.png")])
+        self.assertEqual(["getElementTagName", "isElementDisplayed", "clearElement"],
+                         [c[0][0] for c in execute.call_args_list])
+        send_keys.assert_called_once_with(u"/tmp/photo.png")
+        self.assertEqual('p', self.page.photo.id)
+
+    @patch.object(WebElement, "_execute")
+    def test_native_events(self, execute):
+        execute.return_value = {"value": "input"}
+        self.driver.execute_script.return_value = [[self.we('l'), False]]
+        with patch.object(PageElement, "send_keys") as send_keys:
+            self.page.fill({"login": 42}, native_events=True)
+        self.assertFalse(self.driver.execute_script.call_args[0][4])
+        send_keys.assert_called_once_with(u"42")
+
+    def test_unknown_fields(self):
+        with self.assertRaises(ValueError):
+            self.page.fill({"items": "x", "password": "secret"})
+        self.assertFalse(self.driver.execute_script.called)
+
+
+class TestXPath(unittest.TestCase):
+    def setUp(self):
+        class Inner(PageElement):
+            field = PageElement("input.text")
+            link = PageElement("$link_text:Help")
+
+        class Block(PageElement):
+            inner = Inner("./div")
+
+        class Page(PageElementsContainer):
+            block = Block("#block")
+
+            def __init__(self, driver):
+                self.driver = driver
+
+        class Remote(object):
+            def find_element(self, by, value):
+                self.found.append((by, value))
+                return type('el', (object,), dict(id=str(len(self.found)), parent=self))
+
+        class Driver(FindOverride, Remote):
+            compile_locators = True
+
+            def __init__(self):
+                self.found = []
+
+        self.driver = Driver()
+        self.page = Page(self.driver)
+
+    def test_css_to_xpath(self):
+        self.assertEqual('descendant::*[self::input and @type="text" and parent::*[@id="form"]]',
+                         xpath.css_to_xpath("#form > input[type='text']"))
+        self.assertEqual('descendant::*[(self::a and ancestor::*[self::li]) or (self::p)]',
+                         xpath.css_to_xpath("li a, p"))
+        self.assertEqual('descendant::*[self::b and preceding-sibling::*[1][self::a]]', xpath.css_to_xpath("a + b"))
+        self.assertIsNone(xpath.css_to_xpath("input:checked"))
+        self.assertIsNone(xpath.css_to_xpath("a:not(.b)"))
+
+    def test_literal(self):
+        self.assertEqual('"a\'b"', xpath.literal("a'b"))
+        self.assertEqual("concat(\"a\", '\"', \"b'c\")", xpath.literal("a\"b'c"))
+
+    def test_nested_elements_are_found_by_one_command(self):
+        self.assertEqual("1", self.page.block.inner.field.id)
+        self.assertEqual([("xpath", '((descendant::*[@id="block"])[1]/div)[1]/descendant::*[self::input and '
+                                    'contains(concat(\' \', normalize-space(@class), \' \'), " text ")]')],
+                         self.driver.found)
+        self.assertIsNone(self.page.block._id)
+
+    def test_chain_is_not_compiled_for_other_locators(self):
+        link = self.page.block.inner.link
+        self.assertEqual((link._owner, ("link text", "Help")), xpath.compile_chain(link))
+
+    def test_found_owner_is_used(self):
+        self.page.block._set_found(type('el', (object,), dict(id="b", parent=self.driver)))
+        owner, locator = xpath.compile_chain(self.page.block.inner.field)
+        self.assertIs(self.page.block, owner)
+        self.assertEqual("xpath", locator[0])
+        self.assertTrue(locator[1].startswith("(div)[1]/descendant::*[self::input"))
+
+    def test_driver_without_support(self):
+        self.driver.compile_locators = False
+        inner = self.page.block.inner
+        self.assertEqual((self.page.block, ("xpath", "./div")), xpath.compile_chain(inner))
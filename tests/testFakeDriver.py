@@ -0,0 +1,164 @@
+import threading
+import time
+import unittest
+
+from mock import patch
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
+
+from pypo4sel import Frame, PageElementsContainer, ShadowRoot
+from pypo4sel.core import waiter
+from pypo4sel.core.dom import HIDDEN_ATTRIBUTE
+from pypo4sel.core.elements import PageElement, PageElementsList
+from pypo4sel.core.fakedriver import FakeDriver
+
+HTML = """<html><body>
+<form id="form">
+    <input name="login" value="">
+    <input type="checkbox" name="remember">
+    <select name="lang"><option value="en">English</option><option value="no">Norsk</option></select>
+    <button id="submit">Send</button>
+</form>
+<ul id="items"><li>one</li><li>two</li><li>three</li></ul>
+<div id="message" data-snapshot-hidden="none">Saved</div>
+</body></html>"""
+
+
+class Block(PageElement):
+    button = PageElement("#submit")
+
+
+class Page(PageElementsContainer):
+    login = PageElement("[name=login]")
+    remember = PageElement("[name=remember]")
+    lang = PageElement("[name=lang]")
+    form = Block("#form")
+    items = PageElementsList("#items > li")
+    message = PageElement("#message")
+
+    def __init__(self, driver):
+        self.driver = driver
+
+
+class Editor(Frame):
+    login = PageElement("[name=login]")
+
+
+class Picker(ShadowRoot):
+    lang = PageElement("[name=lang]")
+
+
+class ScopedPage(PageElementsContainer):
+    editor = Editor("#form")
+    picker = Picker("#form")
+    message = PageElement("#message")
+
+    def __init__(self, driver):
+        self.driver = driver
+
+
+class TestFakeDriver(unittest.TestCase):
+    def setUp(self):
+        self.driver = FakeDriver(HTML, pages={"http://fake/next": "<h1>Next</h1>"})
+        self.page = Page(self.driver)
+
+    def test_interactions(self):
+        self.page.login.send_keys("user")
+        self.page.remember.click()
+        self.assertEqual("user", self.page.login.get_attribute("value"))
+        self.assertTrue(self.page.remember.is_selected())
+        self.page.login.clear()
+        self.assertEqual("", self.page.login.get_attribute("value"))
+
+    def test_counters(self):
+        self.assertEqual(["one", "two", "three"], [i.text for i in self.page.items])
+        # find of the list, text of each item, find of the list again at the end of iteration
+        self.assertEqual(5, self.driver.counters.command_count)
+
+    def test_latency(self):
+        self.driver.latency = 0.01
+        self.driver.command_latency = {"getElementText": 0.05}
+        t = time.time()
+        self.assertEqual("Send", self.page.form.button.text)
+        self.assertAlmostEqual(0.08, time.time() - t, delta=0.03)
+
+    def test_stale_element_is_found_again(self):
+        self.page.remember.click()
+        old_id = self.page.remember.id
+        self.driver.inject_stale()
+        self.page.remember.click()
+        self.assertNotEqual(old_id, self.page.remember.id)
+        self.assertFalse(self.page.remember.is_selected())
+        self.assertEqual(1, self.driver.counters.stale_retries)
+
+    def test_stale_every(self):
+        self.driver.stale_every = 2
+        self.page.login.send_keys("a")
+        self.page.login.send_keys("b")
+        self.assertEqual("ab", self.page.login.get_attribute("value"))
+        with self.assertRaises(StaleElementReferenceException):
+            self.driver.execute("getElementText", {"id": "unknown"})
+
+    def test_library_scripts(self):
+        self.assertTrue(self.page.prefetch())
+        self.assertEqual(1, self.driver.counters.command_count)
+        self.assertEqual(["one", "two", "three"], [r.text for r in self.page.items.fetch()])
+        self.page.fill([("login", "admin"), ("remember", True), ("lang", "Norsk")])
+        self.assertEqual("admin", self.page.login.get_attribute("value"))
+        self.assertTrue(self.page.remember.is_selected())
+        self.assertEqual("no", self.page.lang.get_attribute("value"))
+        self.assertEqual("Send", Page(self.driver.snapshot()).form.button.text)
+        with self.assertRaises(WebDriverException):
+            self.driver.execute_script("return 1")
+
+    def test_waiting_for_delayed_rendering(self):
+        timer = threading.Timer(0.2, lambda: self.driver.node("#message").attrib.pop(HIDDEN_ATTRIBUTE))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertFalse(self.page.message.is_displayed())
+        self.assertTrue(waiter.wait_displayed(self.page.message, 2))
+        with patch.object(waiter, "wait_engine", waiter.BrowserWait()):
+            self.assertTrue(waiter.wait_displayed(self.page.message, 2))
+
+    def test_navigation(self):
+        self.driver.get("http://fake/next")
+        self.assertEqual("Next", self.driver.child_element("h1").text)
+        self.assertFalse(self.page.login.exists())
+
+    def test_elements_are_searched_again_after_navigation(self):
+        self.driver.pages["http://fake/"] = HTML
+        self.page.login.send_keys("user")
+        with self.page.items.snapshot() as items:
+            self.assertEqual(3, len(items))
+            self.driver.get("http://fake/")
+            self.driver.counters.reset()
+            self.page.login.send_keys("user")
+            self.assertEqual(3, len(items))
+        self.assertEqual(0, self.driver.counters.stale_retries)
+        self.assertEqual(1, self.driver.counters.commands["findElement"][0])
+        self.assertEqual(1, self.driver.counters.commands["findElements"][0])
+
+    def test_frame_is_switched_only_when_it_changes(self):
+        page = ScopedPage(self.driver)
+        page.editor.login.send_keys("a")
+        page.editor.login.send_keys("b")
+        # switch to the top document and into the frame
+        self.assertEqual(2, self.driver.counters.commands["switchToFrame"][0])
+        self.assertEqual("ab", page.editor.login.get_attribute("value"))
+        page.message.is_displayed()
+        self.assertEqual(3, self.driver.counters.commands["switchToFrame"][0])
+        self.assertEqual(0, self.driver.epoch)
+        # the frame, the field in the frame and the message
+        self.assertEqual(3, self.driver.counters.commands["findElement"][0])
+
+    def test_switch_by_user_invalidates_elements(self):
+        self.page.login.send_keys("a")
+        self.driver.switch_to.default_content()
+        self.assertEqual(1, self.driver.epoch)
+        self.page.login.send_keys("b")
+        self.assertEqual(2, self.driver.counters.commands["findElement"][0])
+
+    def test_shadow_root_children_are_found_by_script(self):
+        page = ScopedPage(self.driver)
+        self.assertEqual("lang", page.picker.lang.get_attribute("name"))
+        self.assertEqual(1, self.driver.counters.commands["executeScript"][0])
+        self.assertNotIn("findChildElement", self.driver.counters.commands)
@@ -0,0 +1,139 @@
+import threading
+import time
+import unittest
+
+from mock import Mock, patch
+
+from pypo4sel.core import log2l
+
+
+class Element(object):
+    _name = "element"
+
+    @log2l.step
+    def method(self, *args, **kwargs):
+        return args, kwargs
+
+    @log2l.step("custom text", element_name="custom")
+    def custom(self):
+        pass
+
+    @log2l.step
+    def fail(self):
+        raise ValueError()
+
+
+class TestStep(unittest.TestCase):
+    def setUp(self):
+        self.listener = Mock(spec=log2l.ListenerMixin)
+        patcher = patch.object(log2l, 'listeners', [self.listener])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_options(self):
+        e = Element()
+        self.assertEqual(((1,), {'a': 2}), e.method(1, a=2))
+        step_id = self.listener.start_step.call_args[0][0]
+        self.listener.start_step.assert_called_once_with(step_id, element_name="element", step_name="method",
+                                                         args=(e, 1), kwargs={'a': 2})
+        self.listener.end_step.assert_called_once_with(step_id)
+
+    def test_step_options_override_defaults(self):
+        e = Element()
+        e.custom()
+        self.listener.start_step.assert_called_once_with(self.listener.start_step.call_args[0][0],
+                                                         element_name="custom", step_name="custom",
+                                                         first_param="custom text", args=(e,), kwargs={})
+
+    def test_step_ids_are_unique(self):
+        Element().method()
+        Element().method()
+        first, second = [c[0][0] for c in self.listener.start_step.call_args_list]
+        self.assertLess(first, second)
+
+    def test_exception(self):
+        with self.assertRaises(ValueError):
+            Element().fail()
+        self.assertIs(ValueError, self.listener.exception.call_args[0][1][0])
+        self.listener.end_step.assert_called_once_with(self.listener.start_step.call_args[0][0])
+
+    @patch.object(log2l, 'listeners', [])
+    @patch.object(log2l, '_notify_start')
+    def test_no_notifications_without_listeners(self, notify):
+        self.assertEqual(((1,), {}), Element().method(1))
+        self.assertFalse(notify.called)
+
+
+class TestAsyncDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.release = threading.Event()
+        self.release.set()
+        self.addCleanup(self.release.set)
+
+        class Target(log2l.ListenerMixin):
+            def start_step(s, step_id, **options):
+                self.release.wait()
+                self.events.append(("start", step_id))
+
+            def end_step(s, step_id, **options):
+                self.events.append(("end", step_id))
+
+            def message(s, msg, **kwargs):
+                self.events.append(("message", msg))
+
+        self.target = Target()
+
+    def test_events_are_delivered_in_order(self):
+        sut = log2l.AsyncDispatcher([self.target], batch_size=3)
+        for i in range(10):
+            sut.start_step(i)
+            sut.message(i)
+            sut.end_step(i)
+        sut.flush()
+        expected = [e for i in range(10) for e in (("start", i), ("message", i), ("end", i))]
+        self.assertEqual(expected, self.events)
+        sut.close()
+
+    def test_events_are_delivered_on_background_thread(self):
+        self.release.clear()
+        sut = log2l.AsyncDispatcher([self.target])
+        sut.start_step(1)
+        self.assertEqual([], self.events)
+        self.release.set()
+        sut.close()
+        self.assertEqual([("start", 1)], self.events)
+
+    def test_drop_skips_whole_steps(self):
+        self.release.clear()
+        sut = log2l.AsyncDispatcher([self.target], max_size=2, overflow=log2l.AsyncDispatcher.DROP)
+        sut.start_step(0)
+        time.sleep(0.05)  # the first event is taken by the background thread
+        for i in range(1, 5):
+            sut.start_step(i)
+        self.assertEqual(2, sut.skipped)
+        self.release.set()
+        for i in range(5):
+            sut.end_step(i)
+        sut.close()
+        self.assertEqual([("start", 0), ("start", 1), ("start", 2), ("end", 0), ("end", 1), ("end", 2)],
+                         self.events)
+
+    def test_sample(self):
+        self.release.clear()
+        sut = log2l.AsyncDispatcher([self.target], max_size=1, overflow=log2l.AsyncDispatcher.SAMPLE,
+                                    sample_every=2)
+        sut.start_step(0)
+        time.sleep(0.05)
+        sut.start_step(1)
+        threading.Timer(0.05, self.release.set).start()
+        for i in range(2, 6):
+            sut.start_step(i)
+        sut.close()
+        self.assertEqual(2, sut.skipped)
+
+    def test_events_after_close_are_delivered_immediately(self):
+        sut = log2l.AsyncDispatcher([self.target])
+        sut.close()
+        sut.message("late")
+        self.assertEqual([("message", "late")], self.events)
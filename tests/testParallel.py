@@ -0,0 +1,76 @@
+import threading
+import time
+import unittest
+
+from pypo4sel import PageElementsContainer, parallel_map
+from pypo4sel.core import common
+from pypo4sel.core.elements import PageElement, PageElementsList
+from pypo4sel.core.fakedriver import FakeDriver
+
+HTML = """<html><body>
+<ul id="items"><li>one</li><li>two</li><li>three</li><li>four</li></ul>
+<button id="button">Go</button>
+</body></html>"""
+
+
+class Page(PageElementsContainer):
+    items = PageElementsList("#items > li")
+    button = PageElement("#button")
+    missing = PageElement("#missing", timeout=5)
+
+    def __init__(self, driver):
+        self.driver = driver
+
+
+class TestParallelMap(unittest.TestCase):
+    def setUp(self):
+        self.driver = FakeDriver(HTML, latency=0.05)
+        self.page = Page(self.driver)
+
+    def test_results_are_in_order_of_items(self):
+        items = list(self.page.items)
+        start = time.time()
+        results = parallel_map(lambda item: item.text, items)
+        self.assertEqual(["one", "two", "three", "four"], [r.get() for r in results])
+        # text of 4 items is read at once, not one by one
+        self.assertLess(time.time() - start, 4 * 0.05)
+
+    def test_errors_are_kept_per_task(self):
+        def check(number):
+            if number == 2:
+                raise ValueError("wrong")
+            return number
+
+        results = parallel_map(check, [1, 2, 3], workers=2)
+        self.assertEqual([1, 3], [results[0].get(), results[2].get()])
+        self.assertIsInstance(results[1].error, ValueError)
+        with self.assertRaises(ValueError):
+            results[1].get()
+
+    def test_steps_are_collected_per_task(self):
+        results = parallel_map(lambda name: getattr(self.page, name).click(), ["button", "button"])
+        for r in results:
+            self.assertEqual(["click"], [s.step_name for s in r.steps])
+
+    def test_work_is_spread_over_drivers(self):
+        drivers = [FakeDriver(HTML), FakeDriver(HTML)]
+        threads = {}
+
+        def check(driver, number):
+            threads.setdefault(driver.session_id, set()).add(threading.current_thread().name)
+            return Page(driver).button.text
+
+        results = parallel_map(check, range(6), drivers=drivers)
+        self.assertEqual(["Go"] * 6, [r.get() for r in results])
+        self.assertEqual(1, max(len(names) for names in threads.values()))
+
+    def test_skipped_waiting_doesnt_affect_other_threads(self):
+        missing = self.page.missing
+        timeouts = []
+        with common.skip_wait(missing):
+            self.assertEqual(0, missing.wait_timeout)
+            t = threading.Thread(target=lambda: timeouts.append(missing.wait_timeout))
+            t.start()
+            t.join()
+        self.assertEqual([5], timeouts)
+        self.assertEqual(5, missing.wait_timeout)
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import patch
+
+from pypo4sel.core import log2l
+from pypo4sel.core.tracing import StepTracer, percentile
+
+
+class Element(object):
+    _name = "element"
+
+    @log2l.step
+    def click(self):
+        time.sleep(0.01)
+
+    @log2l.step
+    def fill(self):
+        self.click()
+        self.click()
+
+    @log2l.action
+    def login(self):
+        self.click()
+
+    @log2l.step
+    def fail(self):
+        raise ValueError("wrong")
+
+
+class TestPercentile(unittest.TestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, percentile(values, 50))
+        self.assertEqual(95, percentile(values, 95))
+        self.assertEqual(1, percentile([1], 99))
+        self.assertIsNone(percentile([], 50))
+
+
+class TestStepTracer(unittest.TestCase):
+    def setUp(self):
+        self.sut = StepTracer()
+        patcher = patch.object(log2l, 'listeners', [self.sut])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_tree_of_steps(self):
+        Element().fill()
+        self.assertEqual(1, len(self.sut.spans))
+        root = self.sut.spans[0]
+        self.assertEqual("fill", root.name)
+        self.assertEqual(["click", "click"], [c.name for c in root.children])
+        self.assertGreaterEqual(root.duration, 0.02)
+        self.assertLess(root.self_duration, 0.01)
+
+    def test_action_suppresses_children(self):
+        Element().login()
+        self.assertEqual([], self.sut.spans[0].children)
+        self.assertEqual(["login"], [s["step_name"] for s in self.sut.statistics()])
+
+    def test_statistics(self):
+        e = Element()
+        for _ in range(3):
+            e.click()
+        with log2l.step("group"):
+            e.click()
+        stats = dict(((s["element_name"], s["step_name"]), s) for s in self.sut.statistics())
+        click = stats[("element", "click")]
+        self.assertEqual(4, click["count"])
+        self.assertGreaterEqual(click["total"], 0.04)
+        self.assertLessEqual(click["p50"], click["p99"])
+        self.assertEqual(1, stats[(None, None)]["count"])
+
+    def test_exception(self):
+        with self.assertRaises(ValueError):
+            Element().fail()
+        self.assertEqual("ValueError: wrong", self.sut.spans[0].error)
+
+    def test_save(self):
+        Element().fill()
+        path = os.path.join(self.dir, "steps.json")
+        self.sut.save_json(path)
+        with open(path) as f:
+            data = json.load(f)
+        self.assertEqual("fill", data["steps"][0]["name"])
+        self.assertEqual(2, len(data["statistics"]))
+
+        path = os.path.join(self.dir, "trace.json")
+        self.sut.save_chrome_trace(path)
+        with open(path) as f:
+            events = [e for e in json.load(f)["traceEvents"] if e["ph"] == "X"]
+        self.assertEqual(["fill", "click", "click"], [e["name"] for e in events])
+        self.assertGreaterEqual(events[1]["ts"], events[0]["ts"])
@@ -0,0 +1,100 @@
+import gzip
+import io
+import json
+import socket
+import threading
+import time
+import unittest
+
+from selenium.webdriver.remote.command import Command
+from six.moves import BaseHTTPServer, socketserver
+
+from pypo4sel.core.transport import PooledConnection
+from pypo4sel.core.webdrivers import get_driver
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.respond()
+
+    def do_DELETE(self):
+        self.respond()
+
+    def respond(self):
+        if self.path.endswith("/url") and self.command == "POST":
+            time.sleep(0.5)
+        value = "x" * 10000 if self.path.endswith("/source") else "title"
+        body = json.dumps({"sessionId": "session", "status": 0, "value": value}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            buf = io.BytesIO()
+            with gzip.GzipFile(fileobj=buf, mode="wb") as f:
+                f.write(body)
+            body = buf.getvalue()
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    connections = 0
+
+
+class TestPooledConnection(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(("127.0.0.1", 0), StubHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_is_reused(self):
+        # the address is not resolved, resolving checks the port by separate connection
+        executor = PooledConnection(self.url, resolve_ip=False)
+        for _ in range(5):
+            self.assertEqual("title", executor.execute(Command.GET_TITLE, {"sessionId": "session"})["value"])
+        self.assertEqual(5, executor.requests)
+        self.assertEqual(1, executor.connections_opened)
+        self.assertEqual(1, self.server.connections)
+        executor.close()
+
+    def test_compressed_response(self):
+        executor = PooledConnection(self.url)
+        self.assertEqual("x" * 10000, executor.execute(Command.GET_PAGE_SOURCE, {"sessionId": "session"})["value"])
+        executor.close()
+
+    def test_command_timeout(self):
+        executor = PooledConnection(self.url, command_timeouts={Command.GET: 0.1})
+        with self.assertRaises(socket.timeout):
+            executor.execute(Command.GET, {"sessionId": "session", "url": "about:blank"})
+        self.assertEqual("title", executor.execute(Command.GET_TITLE, {"sessionId": "session"})["value"])
+        executor.close()
+
+    def test_get_driver_with_transport(self):
+        driver = get_driver("remote", {"command_executor": self.url, "desired_capabilities": {},
+                                       "transport": {"pool_size": 2}})
+        for _ in range(3):
+            self.assertEqual("title", driver.title)
+        self.assertIsInstance(driver.command_executor, PooledConnection)
+        self.assertEqual(1, driver.command_executor.connections_opened)
+        driver.command_executor.close()
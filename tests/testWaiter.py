@@ -0,0 +1,142 @@
+import time
+import unittest
+
+from mock import Mock, patch
+from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
+from pypo4sel.core import waiter
+from pypo4sel.core.counters import CommandCounters
+from pypo4sel.core.elements import PageElement, WebElement
+from pypo4sel.core.waiter import BackoffPoll, BrowserWait, DelayedRecovery, FixedPoll, StaleRecovery, Waiter
+
+
+def take(iterator, n):
+    return [next(iterator) for _ in range(n)]
+
+
+class TestPollStrategies(unittest.TestCase):
+    def test_fixed_poll_uses_common_frequency(self):
+        with patch('pypo4sel.core.common.WAIT_ELEMENT_POLL_FREQUENCY', 0.3):
+            self.assertEqual([0.3, 0.3], take(FixedPoll().delays(), 2))
+        self.assertEqual([1, 1], take(FixedPoll(1).delays(), 2))
+
+    def test_backoff_poll(self):
+        delays = take(BackoffPoll(first=0.01, initial=0.05, factor=2, max_delay=0.3, jitter=0).delays(), 6)
+        self.assertEqual([0.01, 0.05, 0.1, 0.2, 0.3, 0.3], delays)
+
+    def test_backoff_poll_jitter(self):
+        for d in take(BackoffPoll(initial=0.1, factor=1, jitter=0.2).delays(), 20)[1:]:
+            self.assertTrue(0.08 <= d <= 0.12, d)
+
+
+class TestWaiter(unittest.TestCase):
+    def test_fast_first_poll(self):
+        values = iter([False, True])
+        t = time.time()
+        self.assertTrue(Waiter(bool, BackoffPoll(first=0.01))(lambda: next(values), 5))
+        self.assertLess(time.time() - t, 0.1)
+
+    def test_last_poll_at_deadline(self):
+        calls = []
+        t = time.time()
+        with self.assertRaises(TimeoutException):
+            Waiter(bool, FixedPoll(0.4))(lambda: calls.append(time.time() - t), 0.5, "fail")
+        self.assertEqual(3, len(calls))
+        self.assertAlmostEqual(0.5, calls[-1], delta=0.05)
+
+    @patch('time.sleep')
+    def test_default_strategy_is_used(self, sleep):
+        values = iter([False, False, True])
+        with patch.object(waiter, 'poll_strategy', FixedPoll(0.05)):
+            waiter.wait(lambda: next(values), 10)
+        self.assertEqual([((0.05,),), ((0.05,),)], sleep.call_args_list)
+
+    @patch('time.sleep')
+    def test_sleep_is_counted(self, sleep):
+        values = iter([False, False, True])
+        counters = CommandCounters()
+        Waiter(bool, FixedPoll(0.05), counters)(lambda: next(values), 10)
+        self.assertEqual(2, counters.wait_polls)
+        self.assertAlmostEqual(0.1, counters.wait_sleep)
+
+
+@patch('time.sleep')
+class TestStaleRecovery(unittest.TestCase):
+    def setUp(self):
+        self.element = Mock(wait_timeout=0, stale_recovery=None)
+        self.element.parent.counters = CommandCounters()
+
+    def test_first_recovery_without_sleep(self, sleep):
+        waiter.recover_stale(self.element)
+        self.element.reload.assert_called_once_with()
+        self.assertFalse(sleep.called)
+        self.assertEqual(1, self.element.parent.counters.stale_retries)
+
+    def test_sleep_if_not_found(self, sleep):
+        self.element.reload.side_effect = [NoSuchElementException(), None]
+        StaleRecovery(FixedPoll(0.1)).recover(self.element)
+        self.assertEqual(2, self.element.reload.call_count)
+        sleep.assert_called_once_with(0.1)
+        self.assertEqual(0.1, self.element.parent.counters.wait_sleep)
+
+    def test_raise_if_not_found_after_tries(self, sleep):
+        self.element.reload.side_effect = NoSuchElementException()
+        with self.assertRaises(NoSuchElementException):
+            StaleRecovery(FixedPoll(0.1), tries=3).recover(self.element)
+        self.assertEqual(3, self.element.reload.call_count)
+
+    def test_element_with_timeout_is_not_found_again(self, sleep):
+        self.element.wait_timeout = 5
+        self.element.reload.side_effect = NoSuchElementException()
+        with self.assertRaises(NoSuchElementException):
+            StaleRecovery().recover(self.element)
+        self.assertEqual(1, self.element.reload.call_count)
+
+    def test_repeated_recovery_sleeps(self, sleep):
+        StaleRecovery(BackoffPoll(first=0.01, initial=0.05, jitter=0)).recover(self.element, 2)
+        sleep.assert_called_once_with(0.05)
+
+    def test_element_policy(self, sleep):
+        self.element.stale_recovery = DelayedRecovery(0.3)
+        waiter.recover_stale(self.element)
+        sleep.assert_called_once_with(0.3)
+        self.element.reload.assert_called_once_with()
+
+
+# noinspection PyUnresolvedReferences
+class TestBrowserWait(unittest.TestCase):
+    def setUp(self):
+        self.driver = Mock(script_wait_timeout=30)
+        self.sut = PageElement("#selector")
+        self.sut._fill_owner(type("Page", (object,), {'driver': self.driver})())
+        patcher = patch.object(waiter, 'wait_engine', BrowserWait())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_wait_displayed_with_one_script_call(self):
+        self.driver.execute_async_script.return_value = [True, type('el', (object,), dict(id='1', parent='p'))]
+        self.assertTrue(waiter.wait_displayed(self.sut, 5))
+        self.driver.execute_async_script.assert_called_once_with(waiter.scripts.WAIT, None, ['id', 'selector'],
+                                                                 'displayed', 5000)
+        self.assertEqual('1', self.sut.id)
+        self.assertFalse(self.driver.set_script_timeout.called)
+
+    def test_wait_not_displayed_timeout(self):
+        self.driver.execute_async_script.return_value = [False, None]
+        with self.assertRaises(TimeoutException):
+            waiter.wait_not_displayed(self.sut, 2, "fail")
+        self.assertEqual('hidden', self.driver.execute_async_script.call_args[0][3])
+
+    def test_script_timeout_is_increased(self):
+        self.driver.execute_async_script.return_value = [False, None]
+        self.assertFalse(waiter.wait_displayed(self.sut, 40))
+        self.driver.set_script_timeout.assert_called_once_with(41)
+
+    @patch.object(WebElement, "find_element")
+    def test_reload_waits_in_browser(self, find):
+        self.driver.execute_async_script.return_value = [False, None]
+        self.sut.wait_timeout = 3
+        with self.assertRaises(NoSuchElementException):
+            self.sut.reload()
+        self.assertEqual('present', self.driver.execute_async_script.call_args[0][3])
+        self.assertFalse(find.called)
@@ -0,0 +1,147 @@
+import unittest
+
+from mock import Mock
+from selenium.common.exceptions import WebDriverException
+
+from pypo4sel.core import common
+from pypo4sel.core.webdrivers import DriverPool, WebDriverBase
+
+
+class TestWebDriverBase(unittest.TestCase):
+    def test_implicitly_wait_is_per_driver(self):
+        first, second = WebDriverBase(), WebDriverBase()
+        self.assertEqual(common.WAIT_ELEMENT_TIMEOUT, first.implicitly_wait(5))
+        self.assertEqual(5, first.implicitly_wait(3))
+        self.assertEqual(3, first.implicitly_wait_timeout)
+        self.assertIsNone(second.implicitly_wait_timeout)
+        self.assertEqual(0, common.WAIT_ELEMENT_TIMEOUT)
+
+
+class Remote(object):
+    def execute(self, driver_command, params=None):
+        if driver_command == "fail":
+            raise WebDriverException()
+        return {"value": None}
+
+
+class CountingDriver(WebDriverBase, Remote):
+    pass
+
+
+class TestCounters(unittest.TestCase):
+    def test_commands_are_counted_per_driver(self):
+        first, second = CountingDriver(), CountingDriver()
+        first.execute("getTitle")
+        first.execute("getTitle")
+        with self.assertRaises(WebDriverException):
+            first.execute("fail")
+        stat = first.counters.as_dict()
+        self.assertEqual(2, stat["commands"]["getTitle"]["count"])
+        self.assertEqual(1, stat["commands"]["fail"]["count"])
+        self.assertEqual(3, stat["command_count"])
+        self.assertEqual(3, first.counters.command_count)
+        self.assertGreaterEqual(stat["command_time"], stat["commands"]["getTitle"]["max"])
+        self.assertEqual(0, second.counters.command_count)
+
+    def test_reset(self):
+        driver = CountingDriver()
+        driver.execute("getTitle")
+        driver.counters.stale_retry()
+        driver.counters.sleep(1)
+        driver.counters.reset()
+        self.assertEqual({"commands": {}, "command_count": 0, "command_time": 0, "stale_retries": 0,
+                          "wait_sleep": 0, "wait_polls": 0}, driver.counters.as_dict())
+
+
+class TestEpoch(unittest.TestCase):
+    def test_navigation_and_switches_start_new_epoch(self):
+        driver = CountingDriver()
+        driver.execute("getTitle")
+        self.assertEqual(0, driver.epoch)
+        for command in ("get", "refresh", "goBack", "switchToFrame", "switchToWindow"):
+            driver.execute(command)
+        self.assertEqual(5, driver.epoch)
+
+    def test_switch_by_library_keeps_epoch(self):
+        driver = CountingDriver()
+        driver._switching_scope = True
+        driver.execute("switchToFrame")
+        self.assertEqual(0, driver.epoch)
+
+    def test_switch_by_user_resets_frame_scope(self):
+        driver = CountingDriver()
+        driver._frame_scope = ("frame",)
+        driver.execute("switchToFrame")
+        self.assertIsNone(driver._frame_scope)
+        driver.execute("get")
+        self.assertEqual((), driver._frame_scope)
+
+
+class FakeDriver(WebDriverBase):
+    def __init__(self):
+        self.session_id = "session"
+        self.current_url = "http://page"
+        self.delete_all_cookies = Mock()
+        self.execute_script = Mock()
+        self.quit = Mock()
+        self.opened = []
+
+    def get(self, url):
+        self.opened.append(url)
+
+
+class TestDriverPool(unittest.TestCase):
+    def setUp(self):
+        self.factory = Mock(side_effect=lambda browser, args: FakeDriver())
+        self.pool = DriverPool(max_uses=2, factory=self.factory)
+
+    def test_pool_hit(self):
+        with self.pool.lease('chrome', {'port': 1}) as first:
+            pass
+        with self.pool.lease('chrome', {'port': 1}) as second:
+            pass
+        self.assertIs(first, second)
+        self.factory.assert_called_once_with('chrome', {'port': 1})
+        first.delete_all_cookies.assert_called_with()
+        self.assertEqual(['about:blank'], first.opened)
+
+    def test_different_args_are_not_shared(self):
+        with self.pool.lease('chrome', {'port': 1}) as first:
+            pass
+        with self.pool.lease('chrome', {'port': 2}) as second:
+            pass
+        self.assertIsNot(first, second)
+
+    def test_driver_is_quit_after_max_uses(self):
+        for _ in range(2):
+            with self.pool.lease() as driver:
+                pass
+        driver.quit.assert_called_once_with()
+        with self.pool.lease() as another:
+            pass
+        self.assertIsNot(driver, another)
+
+    def test_failed_driver_is_quit(self):
+        with self.assertRaises(WebDriverException):
+            with self.pool.lease() as driver:
+                raise WebDriverException()
+        driver.quit.assert_called_once_with()
+        self.assertIsNot(driver, self.pool.acquire())
+
+    def test_dead_driver_is_replaced(self):
+        with self.pool.lease() as driver:
+            pass
+        driver.session_id = None
+        self.assertIsNot(driver, self.pool.acquire())
+        driver.quit.assert_called_once_with()
+
+    def test_implicit_timeout_is_reset(self):
+        with self.pool.lease() as driver:
+            driver.implicitly_wait(10)
+        self.assertIsNone(self.pool.acquire().implicitly_wait_timeout)
+
+    def test_close_quits_idle_drivers(self):
+        with self.pool.lease() as driver:
+            pass
+        self.pool.close()
+        driver.quit.assert_called_once_with()